@@ -0,0 +1,46 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from jobs.queue import (queue_stats, requeue_stale_jobs, run_pending,
+                        start_workers)
+from monitoring import metrics
+
+
+class Command(BaseCommand):
+    help = 'Запускает воркеры фоновых задач'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=2,
+                            help='Число потоков-воркеров')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Пауза между опросами пустой очереди, с')
+        parser.add_argument('--once', action='store_true',
+                            help='Выполнить готовые задачи и выйти')
+        parser.add_argument('--stats', action='store_true',
+                            help='Показать состояние очереди и выйти')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            for key, value in queue_stats().items():
+                self.stdout.write(f'{key}: {value}')
+            return
+        requeue_stale_jobs()
+        if options['once']:
+            done = run_pending()
+            self.stdout.write(f'Выполнено задач: {done}')
+            return
+
+        metrics.enable()
+        stop_event, threads = start_workers(options['concurrency'],
+                                            options['poll_interval'])
+        signal.signal(signal.SIGTERM, lambda *args: stop_event.set())
+        self.stdout.write(
+            f'Запущено воркеров: {options["concurrency"]}')
+        try:
+            while not stop_event.wait(60):
+                requeue_stale_jobs()
+        except KeyboardInterrupt:
+            stop_event.set()
+        for thread in threads:
+            thread.join()
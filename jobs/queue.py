@@ -0,0 +1,213 @@
+import json
+import logging
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+from django.db.models import Count, F, Min
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+registry = {}
+
+# Самая долгая пауза воркера после ошибок базы подряд, с.
+MAX_BACKOFF = 60
+
+
+class Task:
+    def __init__(self, func, name, max_attempts, concurrency):
+        self.func = func
+        self.name = name
+        self.max_attempts = max_attempts
+        self.concurrency = concurrency
+
+    def __call__(self, **kwargs):
+        return self.func(**kwargs)
+
+    def enqueue(self, run_after=None, **kwargs):
+        """Ставит задачу в очередь. Аргументы должны сериализоваться
+        в JSON. При JOBS_EAGER задача выполняется сразу.
+        """
+        if settings.JOBS_EAGER:
+            self.func(**kwargs)
+            return None
+        return Job.objects.create(
+            name=self.name,
+            payload=json.dumps(kwargs),
+            max_attempts=self.max_attempts,
+            run_after=run_after or timezone.now(),
+        )
+
+
+def task(name=None, max_attempts=3, concurrency=None):
+    """Регистрирует функцию как фоновую задачу.
+
+    concurrency ограничивает число одновременно выполняемых задач с этим
+    именем на всех воркерах.
+    """
+    def decorator(func):
+        task_name = name or f'{func.__module__}.{func.__name__}'
+        registry[task_name] = Task(func, task_name, max_attempts,
+                                   concurrency)
+        return registry[task_name]
+    return decorator
+
+
+def claim_job():
+    now = timezone.now()
+    candidates = (Job.objects.filter(status=Job.PENDING, run_after__lte=now)
+                  .order_by('run_after')
+                  .values_list('pk', 'name')[:20])
+    running = None
+    for pk, name in candidates:
+        spec = registry.get(name)
+        if spec is not None and spec.concurrency:
+            if running is None:
+                running = dict(
+                    Job.objects.filter(status=Job.RUNNING)
+                    .order_by()
+                    .values('name')
+                    .annotate(running=Count('pk'))
+                    .values_list('name', 'running')
+                )
+            # Предварительная проверка только отсеивает заведомо занятые
+            # имена, сам лимит проверяет _claim.
+            if running.get(name, 0) >= spec.concurrency:
+                continue
+        concurrency = spec.concurrency if spec is not None else None
+        if _claim(pk, now, concurrency):
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def _claim(pk, now, concurrency=None):
+    """Забирает задачу одним UPDATE с условием на статус, поэтому её
+    получает только один воркер. При concurrency в том же запросе
+    проверяется число выполняющихся задач с тем же именем: два воркера
+    не могут одновременно занять последнее место.
+    """
+    if not concurrency:
+        return Job.objects.filter(pk=pk, status=Job.PENDING).update(
+            status=Job.RUNNING, started=now, attempts=F('attempts') + 1)
+    connection = connections[Job.objects.db]
+    qn = connection.ops.quote_name
+    opts = Job._meta
+    table = qn(opts.db_table)
+    pk_column = qn(opts.pk.column)
+    name, status, started, attempts = (
+        qn(opts.get_field(field).column)
+        for field in ('name', 'status', 'started', 'attempts')
+    )
+    sql = (
+        f'UPDATE {table} SET {status} = %s, {started} = %s, '
+        f'{attempts} = {attempts} + 1 '
+        f'WHERE {pk_column} = %s AND {status} = %s AND ('
+        f'SELECT COUNT(*) FROM {table} running '
+        f'WHERE running.{name} = {table}.{name} '
+        f'AND running.{status} = %s) < %s'
+    )
+    started_value = opts.get_field('started').get_db_prep_value(
+        now, connection)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [Job.RUNNING, started_value, pk, Job.PENDING,
+                             Job.RUNNING, concurrency])
+        return cursor.rowcount
+
+
+def execute_job(job):
+    try:
+        spec = registry[job.name]
+        spec.func(**json.loads(job.payload))
+    except Exception:
+        job.error = traceback.format_exc()
+        now = timezone.now()
+        if job.attempts >= job.max_attempts:
+            job.status = Job.FAILED
+            job.finished = now
+        else:
+            job.status = Job.PENDING
+            delay = settings.JOBS_RETRY_DELAY * 2 ** (job.attempts - 1)
+            job.run_after = now + timedelta(seconds=delay)
+        job.save()
+        return False
+    job.delete()
+    return True
+
+
+def requeue_stale_jobs():
+    """Возвращает в очередь задачи, воркер которых пропал."""
+    deadline = timezone.now() - timedelta(seconds=settings.JOBS_TIMEOUT)
+    return Job.objects.filter(status=Job.RUNNING,
+                              started__lt=deadline).update(
+        status=Job.PENDING)
+
+
+def run_pending(limit=None):
+    """Выполняет готовые задачи в текущем потоке, пока очередь не
+    опустеет. Возвращает число выполненных задач.
+    """
+    done = 0
+    while limit is None or done < limit:
+        job = claim_job()
+        if job is None:
+            break
+        execute_job(job)
+        done += 1
+    return done
+
+
+def work(stop_event, poll_interval):
+    errors = 0
+    while not stop_event.is_set():
+        try:
+            close_old_connections()
+            job = claim_job()
+            if job is None:
+                stop_event.wait(poll_interval)
+                continue
+            execute_job(job)
+            errors = 0
+        except Exception:
+            # Ошибка вне задачи, например «database is locked» в UPDATE
+            # при захвате или в job.save(), не должна молча остановить
+            # поток: соединение закрывается, воркер ждёт и продолжает.
+            # Захваченная задача вернётся в очередь requeue_stale_jobs.
+            errors += 1
+            logger.exception('Ошибка воркера задач')
+            close_old_connections()
+            stop_event.wait(min(poll_interval * 2 ** errors, MAX_BACKOFF))
+    close_old_connections()
+
+
+def start_workers(concurrency, poll_interval):
+    stop_event = threading.Event()
+    threads = [
+        threading.Thread(target=work, args=(stop_event, poll_interval),
+                         name=f'jobs-worker-{number}', daemon=True)
+        for number in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    return stop_event, threads
+
+
+def queue_stats():
+    """Глубина очереди по статусам и задержка самой старой готовой
+    к выполнению задачи в секундах.
+    """
+    now = timezone.now()
+    stats = {status: 0 for status, _ in Job.STATUS_CHOICES}
+    stats.update(
+        Job.objects.order_by().values('status')
+        .annotate(total=Count('pk')).values_list('status', 'total')
+    )
+    oldest = Job.objects.filter(
+        status=Job.PENDING, run_after__lte=now
+    ).aggregate(oldest=Min('run_after'))['oldest']
+    stats['latency'] = (now - oldest).total_seconds() if oldest else 0.0
+    return stats
@@ -0,0 +1,119 @@
+import threading
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import OperationalError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from jobs.models import Job
+from jobs.queue import (_claim, claim_job, queue_stats, run_pending, task,
+                        work)
+
+calls = []
+
+
+@task(name='tests.collect')
+def collect(value):
+    calls.append(value)
+
+
+@task(name='tests.broken', max_attempts=2)
+def broken():
+    raise ValueError('broken')
+
+
+@task(name='tests.limited', concurrency=1)
+def limited():
+    pass
+
+
+class JobQueueTest(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_enqueued_job_runs_in_worker(self):
+        """Задача выполняется воркером и удаляется из очереди"""
+        collect.enqueue(value=42)
+        self.assertEqual(calls, [])
+        out = StringIO()
+        call_command('run_workers', once=True, stdout=out)
+        self.assertEqual(calls, [42])
+        self.assertFalse(Job.objects.exists())
+
+    @override_settings(JOBS_EAGER=True)
+    def test_eager_mode_runs_inline(self):
+        """При JOBS_EAGER задача выполняется сразу"""
+        collect.enqueue(value=1)
+        self.assertEqual(calls, [1])
+        self.assertFalse(Job.objects.exists())
+
+    @override_settings(JOBS_RETRY_DELAY=60)
+    def test_failed_job_is_retried_then_marked_failed(self):
+        """Упавшая задача откладывается для повтора, а после
+        max_attempts помечается как ошибочная
+        """
+        job = broken.enqueue()
+        run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.PENDING)
+        self.assertEqual(job.attempts, 1)
+        self.assertIn('ValueError', job.error)
+        self.assertGreater(job.run_after,
+                           timezone.now() + timedelta(seconds=50))
+
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    def test_concurrency_limit(self):
+        """Не запускается больше concurrency задач с одним именем"""
+        limited.enqueue()
+        limited.enqueue()
+        self.assertIsNotNone(claim_job())
+        self.assertIsNone(claim_job())
+
+    def test_claim_checks_limit_in_same_statement(self):
+        """Задача не забирается, если место уже занял другой воркер,
+        даже когда предварительная проверка этого не увидела
+        """
+        first = limited.enqueue()
+        second = limited.enqueue()
+        now = timezone.now()
+        self.assertEqual(_claim(first.pk, now, concurrency=1), 1)
+        self.assertEqual(_claim(second.pk, now, concurrency=1), 0)
+        second.refresh_from_db()
+        self.assertEqual(second.status, Job.PENDING)
+        self.assertEqual(second.attempts, 0)
+
+    def test_queue_stats(self):
+        """Статистика показывает глубину очереди и задержку"""
+        collect.enqueue(value=1,
+                        run_after=timezone.now() - timedelta(seconds=30))
+        stats = queue_stats()
+        self.assertEqual(stats[Job.PENDING], 1)
+        self.assertEqual(stats[Job.RUNNING], 0)
+        self.assertGreaterEqual(stats['latency'], 30)
+
+    def test_worker_survives_database_errors(self):
+        """Ошибка базы при захвате задачи записывается в лог, а воркер
+        продолжает работу
+        """
+        stop_event = threading.Event()
+        attempts = []
+
+        def claim():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise OperationalError('database is locked')
+            stop_event.set()
+
+        with mock.patch('jobs.queue.claim_job', side_effect=claim), \
+                self.assertLogs('jobs.queue', 'ERROR') as logs:
+            work(stop_event, poll_interval=0)
+        self.assertEqual(len(attempts), 2)
+        self.assertIn('database is locked', logs.output[0])
@@ -0,0 +1,46 @@
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.memcached import MemcachedCache
+
+from . import metrics
+
+# Префиксы ключей и вид кэша, под которым считаются попадания.
+KINDS = (
+    ('views.decorators.cache.', 'cache_page'),
+    ('template.cache.', 'fragment'),
+    ('page_shell:', 'page_shell'),
+    ('posts_count:', 'count'),
+    ('notifications_unread:', 'notifications'),
+    ('auth_user:', 'user'),
+    ('django.contrib.sessions.', 'session'),
+)
+
+_missing = object()
+
+
+def cache_kind(key):
+    for prefix, kind in KINDS:
+        if key.startswith(prefix):
+            return kind
+    return 'other'
+
+
+class InstrumentedCacheMixin:
+    """Считает попадания и промахи get() в метрике
+    yatube_cache_requests_total.
+    """
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _missing, version)
+        metrics.inc('yatube_cache_requests_total', {
+            'kind': cache_kind(str(key)),
+            'result': 'miss' if value is _missing else 'hit',
+        })
+        return default if value is _missing else value
+
+
+class InstrumentedLocMemCache(InstrumentedCacheMixin, LocMemCache):
+    pass
+
+
+class InstrumentedMemcachedCache(InstrumentedCacheMixin, MemcachedCache):
+    pass
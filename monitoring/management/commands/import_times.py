@@ -0,0 +1,72 @@
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from yatube.warmup import warm_up
+
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$')
+
+
+class Command(BaseCommand):
+    help = ('Запускает интерпретатор с -X importtime и показывает, '
+            'на что уходит время импорта при старте')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--module', default='yatube.wsgi',
+                            help='Модуль, импорт которого замеряется')
+        parser.add_argument('--limit', type=int, default=20,
+                            help='Сколько модулей показывать')
+        parser.add_argument('--warmup', action='store_true',
+                            help='Замерить также шаги прогрева воркера')
+
+    def handle(self, *args, **options):
+        env = dict(os.environ,
+                   DJANGO_SETTINGS_MODULE=os.environ.get(
+                       'DJANGO_SETTINGS_MODULE', 'yatube.settings'))
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c',
+             f'import {options["module"]}'],
+            cwd=settings.BASE_DIR, env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+            universal_newlines=True,
+        )
+        if result.returncode:
+            lines = result.stderr.strip().splitlines()
+            raise CommandError(
+                lines[-1] if lines else
+                f'Интерпретатор завершился с кодом {result.returncode}')
+
+        modules = []
+        packages = defaultdict(int)
+        total = 0
+        for line in result.stderr.splitlines():
+            match = IMPORT_LINE.match(line)
+            if match is None:
+                continue
+            own, cumulative, indent, name = match.groups()
+            modules.append((int(cumulative), int(own), name))
+            packages[name.split('.')[0]] += int(own)
+            if not indent:
+                total += int(cumulative)
+
+        self.stdout.write(f'Всего: {total / 1000:.1f} ms, '
+                          f'модулей: {len(modules)}')
+        self.stdout.write('\nПо пакетам (собственное время):')
+        by_package = sorted(packages.items(), key=lambda item: -item[1])
+        for name, own in by_package[:options['limit']]:
+            self.stdout.write(f'{own / 1000:10.1f} ms  {name}')
+        self.stdout.write('\nМодули (с вложенными импортами):')
+        for cumulative, own, name in sorted(modules,
+                                            reverse=True)[:options['limit']]:
+            self.stdout.write(
+                f'{cumulative / 1000:10.1f} ms {own / 1000:8.1f} ms  {name}')
+
+        if options['warmup']:
+            self.stdout.write('\nПрогрев (yatube.warmup):')
+            for step, seconds in warm_up().items():
+                self.stdout.write(f'{seconds * 1000:10.1f} ms  {step}')
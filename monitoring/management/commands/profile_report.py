@@ -0,0 +1,41 @@
+import glob
+import os
+import pstats
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from monitoring.middleware import profile_dir
+
+
+class Command(BaseCommand):
+    help = ('Сводит профили из PROFILER_DIR в отчёт о самых затратных '
+            'функциях каждого представления')
+
+    def add_arguments(self, parser):
+        parser.add_argument('views', nargs='*',
+                            help='Имена представлений (по умолчанию все)')
+        parser.add_argument('--sort', default='cumulative',
+                            help='Ключ сортировки pstats')
+        parser.add_argument('--limit', type=int, default=20,
+                            help='Сколько функций показывать')
+
+    def handle(self, *args, **options):
+        root = settings.PROFILER_DIR
+        views = options['views']
+        if not views and os.path.isdir(root):
+            views = sorted(os.listdir(root))
+        if not views:
+            raise CommandError(f'Нет профилей в {root}')
+        for view in views:
+            files = sorted(glob.glob(os.path.join(profile_dir(view),
+                                                  '*.prof')))
+            if not files:
+                self.stderr.write(f'{view}: профилей нет')
+                continue
+            stats = pstats.Stats(*files, stream=self.stdout)
+            self.stdout.write(
+                f'== {view}: запросов {len(files)}, в среднем '
+                f'{stats.total_tt / len(files) * 1000:.1f} ms')
+            stats.strip_dirs().sort_stats(options['sort']).print_stats(
+                options['limit'])
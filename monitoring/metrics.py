@@ -0,0 +1,267 @@
+"""Реестр метрик в формате Prometheus.
+
+Каждый процесс копит значения в памяти. Процессы сервера и воркеры
+вызывают enable() и после этого раз в METRICS_FLUSH_INTERVAL секунд
+сбрасывают значения в собственный файл в METRICS_DIR; остальные процессы
+(manage.py, тесты) ничего не пишут. Представление /metrics складывает
+файлы всех процессов, а файлы завершившихся процессов сливает в один.
+"""
+import atexit
+import fcntl
+import glob
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5,
+                    10)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+MERGED_FILE = 'merged.json'
+
+_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_counters = defaultdict(float)
+_histograms = {}
+_process_file = None
+_last_flush = 0.0
+_enabled = False
+
+
+def enable():
+    """Включает запись значений процесса в METRICS_DIR."""
+    global _enabled
+    if not _enabled:
+        _enabled = True
+        atexit.register(flush)
+
+
+def _reset():
+    # Процесс, созданный через fork, начинает со своих нулей и своего
+    # файла, иначе значения родителя посчитаются дважды.
+    global _lock, _flush_lock, _process_file, _last_flush
+    _lock = threading.Lock()
+    _flush_lock = threading.Lock()
+    _counters.clear()
+    _histograms.clear()
+    _process_file = None
+    _last_flush = 0.0
+
+
+os.register_at_fork(after_in_child=_reset)
+
+
+def _key(name, labels):
+    return name, tuple(sorted((labels or {}).items()))
+
+
+def inc(name, labels=None, value=1):
+    with _lock:
+        _counters[_key(name, labels)] += value
+    _maybe_flush()
+
+
+def observe(name, value, labels=None, buckets=DURATION_BUCKETS):
+    with _lock:
+        key = _key(name, labels)
+        if key not in _histograms:
+            _histograms[key] = {'buckets': list(buckets),
+                                'counts': [0] * (len(buckets) + 1),
+                                'sum': 0.0}
+        histogram = _histograms[key]
+        index = next((i for i, bound in enumerate(histogram['buckets'])
+                      if value <= bound), len(histogram['buckets']))
+        histogram['counts'][index] += 1
+        histogram['sum'] += value
+    _maybe_flush()
+
+
+@contextmanager
+def timer(name, labels=None):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, labels)
+
+
+def _maybe_flush():
+    if not _enabled:
+        return
+    if time.monotonic() - _last_flush < settings.METRICS_FLUSH_INTERVAL:
+        return
+    # Пока один поток пишет файл, остальные не ждут его и не пишут сами.
+    if _flush_lock.acquire(blocking=False):
+        try:
+            _flush()
+        finally:
+            _flush_lock.release()
+
+
+def _snapshot():
+    with _lock:
+        return _dump(_counters, _histograms)
+
+
+def flush():
+    """Записывает значения текущего процесса в его файл."""
+    with _flush_lock:
+        _flush()
+
+
+def _flush():
+    global _process_file, _last_flush
+    _last_flush = time.monotonic()
+    # Под _lock только копируются значения, файл пишется без него.
+    data = _snapshot()
+    if not data['counters'] and not data['histograms']:
+        return
+    if _process_file is None:
+        # Время запуска в имени не даёт новому процессу с тем же pid
+        # перезаписать файл завершившегося.
+        _process_file = f'{os.getpid()}-{time.time():.0f}.json'
+    os.makedirs(settings.METRICS_DIR, exist_ok=True)
+    _write(os.path.join(settings.METRICS_DIR, _process_file), data)
+
+
+def _write(path, data):
+    with open(f'{path}.tmp', 'w') as output:
+        json.dump(data, output)
+    os.replace(f'{path}.tmp', path)
+
+
+def _read(path):
+    try:
+        with open(path) as source:
+            return json.load(source)
+    except (OSError, ValueError):
+        return None
+
+
+def _is_alive(path):
+    try:
+        pid = int(os.path.basename(path).split('-')[0])
+    except ValueError:
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _add(counters, histograms, data):
+    for name, labels, value in data['counters']:
+        counters[_key(name, labels)] += value
+    for name, labels, histogram in data['histograms']:
+        key = _key(name, labels)
+        if key not in histograms:
+            histograms[key] = {'buckets': histogram['buckets'],
+                               'counts': [0] * len(histogram['counts']),
+                               'sum': 0.0}
+        total = histograms[key]
+        total['counts'] = [a + b for a, b in zip(total['counts'],
+                                                 histogram['counts'])]
+        total['sum'] += histogram['sum']
+
+
+def _dump(counters, histograms):
+    return {
+        'counters': [[name, dict(labels), value]
+                     for (name, labels), value in counters.items()],
+        'histograms': [[name, dict(labels),
+                        dict(histogram, counts=list(histogram['counts']))]
+                       for (name, labels), histogram in histograms.items()],
+    }
+
+
+def collect():
+    """Складывает значения из файлов всех процессов и текущего процесса.
+
+    Файлы завершившихся процессов прибавляются к merged.json и удаляются:
+    так их значения не теряются, а суммы счётчиков не уменьшаются.
+    """
+    counters = defaultdict(float)
+    histograms = {}
+    dead_counters = defaultdict(float)
+    dead_histograms = {}
+    os.makedirs(settings.METRICS_DIR, exist_ok=True)
+    with open(os.path.join(settings.METRICS_DIR, '.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        merged_path = os.path.join(settings.METRICS_DIR, MERGED_FILE)
+        merged = _read(merged_path)
+        if merged:
+            _add(dead_counters, dead_histograms, merged)
+        dead = []
+        for path in glob.glob(os.path.join(settings.METRICS_DIR, '*.json')):
+            if os.path.basename(path) in (MERGED_FILE, _process_file):
+                continue
+            data = _read(path)
+            if _is_alive(path):
+                if data:
+                    _add(counters, histograms, data)
+                continue
+            dead.append(path)
+            if data:
+                _add(dead_counters, dead_histograms, data)
+        if dead:
+            _write(merged_path, _dump(dead_counters, dead_histograms))
+            for path in dead:
+                os.remove(path)
+    _add(counters, histograms, _dump(dead_counters, dead_histograms))
+    # Значения текущего процесса берутся из памяти, а не из его файла,
+    # который может отставать на METRICS_FLUSH_INTERVAL.
+    _add(counters, histograms, _snapshot())
+    return counters, histograms
+
+
+def _labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (
+        '{}="{}"'.format(name, str(value).replace('\\', r'\\')
+                         .replace('"', r'\"').replace('\n', r'\n'))
+        for name, value in pairs
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+def render(gauges=()):
+    """Текст для Prometheus. gauges: список (имя, labels, значение)
+    для величин, которые считаются в момент запроса.
+    """
+    counters, histograms = collect()
+    lines = []
+    gauges = {_key(name, labels): value for name, labels, value in gauges}
+    families = [(counters, 'counter'), (gauges, 'gauge')]
+    for values, kind in families:
+        typed = set()
+        for name, labels in sorted(values):
+            if name not in typed:
+                lines.append(f'# TYPE {name} {kind}')
+                typed.add(name)
+            value = values[(name, labels)]
+            lines.append(f'{name}{_labels(labels)} {value}')
+    typed = set()
+    for name, labels in sorted(histograms):
+        if name not in typed:
+            lines.append(f'# TYPE {name} histogram')
+            typed.add(name)
+        histogram = histograms[(name, labels)]
+        cumulative = 0
+        bounds = histogram['buckets'] + ['+Inf']
+        for bound, count in zip(bounds, histogram['counts']):
+            cumulative += count
+            lines.append(f'{name}_bucket'
+                         f'{_labels(labels, [("le", bound)])} {cumulative}')
+        lines.append(f'{name}_sum{_labels(labels)} {histogram["sum"]}')
+        lines.append(f'{name}_count{_labels(labels)} {cumulative}')
+    return '\n'.join(lines) + '\n'
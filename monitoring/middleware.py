@@ -0,0 +1,121 @@
+import cProfile
+import hmac
+import os
+import random
+import re
+import time
+
+from django.conf import settings
+from django.db import connection
+
+from . import metrics
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    return match.view_name
+
+
+def profile_dir(name):
+    """Каталог профилей представления внутри PROFILER_DIR."""
+    return os.path.join(settings.PROFILER_DIR, re.sub(r'[^\w.-]', '_', name))
+
+
+def save_profile(profiler, request):
+    directory = profile_dir(view_name(request))
+    os.makedirs(directory, exist_ok=True)
+    filename = '{:.0f}-{}-{:06d}.prof'.format(
+        time.time() * 1000, os.getpid(), random.randrange(10 ** 6))
+    profiler.dump_stats(os.path.join(directory, filename))
+
+
+def _profiled(content, profiler, request):
+    # Потоковый ответ рендерится уже после выхода из middleware, поэтому
+    # профилировщик включается на время получения каждого куска.
+    try:
+        chunks = iter(content)
+        while True:
+            profiler.enable()
+            try:
+                chunk = next(chunks)
+            except StopIteration:
+                break
+            finally:
+                profiler.disable()
+            yield chunk
+    finally:
+        save_profile(profiler, request)
+
+
+class ProfilerMiddleware:
+    """Профилирует cProfile долю PROFILER_SAMPLE_RATE запросов и запросы
+    с заголовком X-Profile, равным PROFILER_TOKEN.
+
+    Профили сохраняются в PROFILER_DIR/<имя представления>/ и сводятся
+    в отчёт командой profile_report.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not self.should_profile(request):
+            return self.get_response(request)
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+        if response.streaming:
+            response.streaming_content = _profiled(
+                response.streaming_content, profiler, request)
+        else:
+            save_profile(profiler, request)
+        return response
+
+    def should_profile(self, request):
+        token = settings.PROFILER_TOKEN
+        header = request.META.get('HTTP_X_PROFILE')
+        if token and header and hmac.compare_digest(header.encode(),
+                                                    token.encode()):
+            return True
+        rate = settings.PROFILER_SAMPLE_RATE
+        return rate > 0 and random.random() < rate
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class MetricsMiddleware:
+    """Считает запросы, время ответа и число обращений к базе по имени
+    URL. Для потоковых ответов время учитывается до начала отдачи.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = QueryCounter()
+        start = time.perf_counter()
+        with connection.execute_wrapper(queries):
+            response = self.get_response(request)
+        labels = {'view': view_name(request)}
+        metrics.observe('yatube_http_request_duration_seconds',
+                        time.perf_counter() - start, labels)
+        metrics.observe('yatube_db_queries', queries.count, labels,
+                        buckets=metrics.QUERY_BUCKETS)
+        metrics.inc('yatube_http_requests_total', {
+            **labels,
+            'method': request.method,
+            'status': response.status_code,
+        })
+        return response
@@ -0,0 +1,129 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from monitoring import metrics
+
+
+class ProfilerTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.profile_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.profile_dir, ignore_errors=True)
+
+    def profiles(self, view):
+        directory = os.path.join(self.profile_dir, view)
+        return os.listdir(directory) if os.path.isdir(directory) else []
+
+    def test_sampled_requests_are_profiled(self):
+        """При PROFILER_SAMPLE_RATE=1 профиль каждого запроса сохраняется
+        в каталог представления и попадает в отчёт
+        """
+        with override_settings(PROFILER_SAMPLE_RATE=1,
+                               PROFILER_DIR=self.profile_dir):
+            Client().get(reverse('index'))
+            Client().get(reverse('index'))
+            self.assertEqual(len(self.profiles('index')), 2)
+            out = StringIO()
+            call_command('profile_report', 'index', '--limit', '5',
+                         stdout=out)
+        self.assertIn('== index: запросов 2', out.getvalue())
+
+    def test_profile_header_requires_token(self):
+        """Заголовок X-Profile включает профилирование только с верным
+        токеном
+        """
+        with override_settings(PROFILER_SAMPLE_RATE=0,
+                               PROFILER_TOKEN='secret',
+                               PROFILER_DIR=self.profile_dir):
+            Client().get(reverse('groups'), HTTP_X_PROFILE='wrong')
+            self.assertEqual(self.profiles('groups'), [])
+            Client().get(reverse('groups'), HTTP_X_PROFILE='secret')
+            self.assertEqual(len(self.profiles('groups')), 1)
+
+
+class MetricsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.metrics_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.metrics_dir, ignore_errors=True)
+        settings_override = override_settings(METRICS_DIR=self.metrics_dir,
+                                              METRICS_TOKEN='secret')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_metrics_endpoint(self):
+        """/metrics отдаёт задержки, статусы, попадания в кэш и очередь
+        задач только по токену
+        """
+        Client().get(reverse('index'))
+        Client().get(reverse('index'))
+        self.assertEqual(Client().get(reverse('metrics')).status_code, 403)
+        response = Client().get(reverse('metrics'),
+                                HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        content = response.content.decode()
+        expected = [
+            '# TYPE yatube_http_request_duration_seconds histogram',
+            'yatube_http_request_duration_seconds_bucket'
+            '{view="index",le="+Inf"}',
+            'yatube_http_requests_total'
+            '{method="GET",status="200",view="index"}',
+            'yatube_db_queries_count{view="index"}',
+            'yatube_cache_requests_total{kind="page_shell",result="hit"}',
+            'yatube_jobs{status="pending"} 0',
+        ]
+        for line in expected:
+            with self.subTest(params=line):
+                self.assertIn(line, content)
+
+    @override_settings(METRICS_FLUSH_INTERVAL=0)
+    def test_only_enabled_processes_write_files(self):
+        """Процесс без metrics.enable() (тесты, manage.py) не пишет файлы"""
+        Client().get(reverse('index'))
+        self.assertEqual(os.listdir(self.metrics_dir), [])
+
+    def test_dead_process_files_are_merged(self):
+        """Файлы завершившихся процессов сливаются в один, значения
+        не теряются
+        """
+        dead = subprocess.Popen([sys.executable, '-c', ''])
+        dead.wait()
+        for start in (1, 2):
+            path = os.path.join(self.metrics_dir, f'{dead.pid}-{start}.json')
+            with open(path, 'w') as output:
+                json.dump({'counters': [['yatube_test_total', {}, start]],
+                           'histograms': []}, output)
+            counters, _ = metrics.collect()
+            self.assertEqual(counters[('yatube_test_total', ())],
+                             start * (start + 1) / 2)
+            self.assertEqual(
+                sorted(os.listdir(self.metrics_dir)),
+                ['.lock', metrics.MERGED_FILE])
+
+
+class ImportTimesTest(TestCase):
+    def test_import_times_report(self):
+        """Команда import_times показывает время импорта и шаги прогрева"""
+        out = StringIO()
+        call_command('import_times', '--limit', '3', '--warmup', stdout=out)
+        report = out.getvalue()
+        self.assertIn('yatube.wsgi', report)
+        self.assertIn('precompile_templates', report)
+
+    def test_import_times_reports_silent_failure(self):
+        """Падение интерпретатора без вывода в stderr даёт CommandError"""
+        failed = subprocess.CompletedProcess([], returncode=1, stderr='')
+        with mock.patch('subprocess.run', return_value=failed):
+            with self.assertRaisesMessage(CommandError, 'кодом 1'):
+                call_command('import_times', stdout=StringIO())
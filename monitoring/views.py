@@ -0,0 +1,24 @@
+import hmac
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+from jobs.queue import queue_stats
+
+from .metrics import render
+
+
+def metrics(request):
+    token = settings.METRICS_TOKEN
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    authorized = token and hmac.compare_digest(header.encode(),
+                                               f'Bearer {token}'.encode())
+    if not (authorized or request.user.is_staff):
+        return HttpResponseForbidden()
+    stats = queue_stats()
+    gauges = [('yatube_jobs_latency_seconds', {}, stats.pop('latency'))]
+    gauges += [('yatube_jobs', {'status': status}, count)
+               for status, count in stats.items()]
+    return HttpResponse(render(gauges),
+                        content_type='text/plain; version=0.0.4; '
+                                     'charset=utf-8')
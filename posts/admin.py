@@ -1,29 +1,168 @@
+import hashlib
+
 from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.contrib.auth.admin import UserAdmin
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+
+from .models import ArchivedPost, Comment, Group, Post, Purge
+from .paginator import cached_count
+from .tasks import purge
+
+User = get_user_model()
+
+
+def start_purge(obj, field):
+    mark, created = Purge.objects.get_or_create(**{field: obj})
+    if field == 'user' and obj.is_active:
+        # Отмеченный пользователь больше не может войти.
+        obj.is_active = False
+        obj.save(update_fields=['is_active'])
+    if created:
+        purge.enqueue(purge_id=mark.pk)
+
+
+class PurgeAdminMixin:
+    """Вместо каскадного удаления в одной транзакции объект отмечается
+    и удаляется фоновой задачей порциями.
+    """
+    actions = ['purge_selected']
+    purge_field = None
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def purge_selected(self, request, queryset):
+        for obj in queryset:
+            start_purge(obj, self.purge_field)
+        self.message_user(request,
+                          f'Отмечено для удаления: {len(queryset)}')
+
+    purge_selected.short_description = 'Удалить в фоне'
+
+
+class EstimatedCountPaginator(Paginator):
+    """Число строк в списке берётся из cached_count: на больших таблицах
+    COUNT(*) не выполняется при каждом открытии страницы.
+    """
+
+    @cached_property
+    def count(self):
+        query = str(self.object_list.query).encode()
+        key = f'posts_count:admin:{hashlib.md5(query).hexdigest()}'
+        return cached_count(self.object_list, key)
+
+
+class InputFilter(admin.SimpleListFilter):
+    """Фильтр с полем ввода вместо списка всех возможных значений."""
+    template = 'admin/input_filter.html'
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def has_output(self):
+        return True
+
+    def choices(self, changelist):
+        yield {
+            'selected': self.value() is None,
+            'query_string': changelist.get_query_string(
+                remove=[self.parameter_name]),
+            'query_parts': [
+                (name, value)
+                for name, value in changelist.get_filters_params().items()
+                if name != self.parameter_name
+            ],
+        }
 
-from .models import Comment, Group, Post
 
+class AuthorFilter(InputFilter):
+    title = 'автору (username)'
+    parameter_name = 'author'
 
-class PostAdmin(admin.ModelAdmin):
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(author__username=self.value())
+        return queryset
+
+
+class GroupFilter(InputFilter):
+    title = 'группе (адрес)'
+    parameter_name = 'group'
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(group__slug=self.value())
+        return queryset
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Настройки списка для таблиц с миллионами строк: связанные объекты
+    загружаются JOIN, фильтры не перечисляют всех пользователей, а общее
+    число строк не пересчитывается на каждой странице.
+
+    Поиск по «@username» и «#адрес-группы» идёт по уникальным индексам
+    без LIKE по всей таблице.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    empty_value_display = '-пусто-'
+
+    search_prefixes = {'@': 'author__username'}
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        lookup = self.search_prefixes.get(term[:1])
+        if lookup:
+            return queryset.filter(**{lookup: term[1:]}), False
+        return super().get_search_results(request, queryset, search_term)
+
+
+class PostAdmin(LargeTableAdmin):
     list_display = ('pk', 'pub_date', 'author', 'group', 'text', 'image')
+    list_select_related = ('author', 'group')
     search_fields = ('text',)
-    list_filter = ('pub_date',)
-    empty_value_display = '-пусто-'
+    search_prefixes = {'@': 'author__username', '#': 'group__slug'}
+    list_filter = ('pub_date', AuthorFilter, GroupFilter)
+    date_hierarchy = 'pub_date'
+    autocomplete_fields = ('author', 'group')
 
 
-class GroupAdmin(admin.ModelAdmin):
+class GroupAdmin(PurgeAdminMixin, admin.ModelAdmin):
+    purge_field = 'group'
     list_display = ('pk', 'title', 'slug', 'description')
     search_fields = ('title',)
-    list_filter = ('title',)
     empty_value_display = '-пусто-'
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(LargeTableAdmin):
     list_display = ('pk', 'created', 'author', 'post', 'text')
+    list_select_related = ('author', 'post')
     search_fields = ('text',)
-    list_filter = ('author',)
-    empty_value_display = '-пусто-'
+    list_filter = (AuthorFilter,)
+    date_hierarchy = 'created'
+    autocomplete_fields = ('author',)
+    raw_id_fields = ('post',)
+
+
+class ArchivedPostAdmin(LargeTableAdmin):
+    list_display = ('pk', 'pub_date', 'author', 'group', 'text', 'archived')
+    list_select_related = ('author', 'group')
+    search_fields = ('text',)
+    search_prefixes = {'@': 'author__username', '#': 'group__slug'}
+    list_filter = ('pub_date', AuthorFilter, GroupFilter)
+    date_hierarchy = 'pub_date'
+    autocomplete_fields = ('author', 'group')
+
+
+class PurgeUserAdmin(PurgeAdminMixin, UserAdmin):
+    purge_field = 'user'
 
 
 admin.site.register(Post, PostAdmin)
+admin.site.register(ArchivedPost, ArchivedPostAdmin)
 admin.site.register(Group, GroupAdmin)
 admin.site.register(Comment, CommentAdmin)
+admin.site.unregister(User)
+admin.site.register(User, PurgeUserAdmin)
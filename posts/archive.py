@@ -0,0 +1,60 @@
+import threading
+from contextlib import contextmanager
+
+from django.db import transaction
+
+from .models import ArchivedComment, ArchivedPost, Comment, Post
+from .paginator import mark_changed
+
+_state = threading.local()
+
+
+@contextmanager
+def archiving():
+    """Помечает удаления в текущем потоке как перенос в архив: посты
+    остаются на сайте, поэтому сигналы не трогают счётчики.
+    """
+    _state.active = True
+    try:
+        yield
+    finally:
+        _state.active = False
+
+
+def is_archiving():
+    return getattr(_state, 'active', False)
+
+
+def archive_batch(before, batch_size):
+    """Переносит в архив до batch_size самых старых постов, опубликованных
+    раньше before, вместе с комментариями. Каждая порция переносится
+    в своей транзакции, поэтому прерванный перенос можно просто
+    запустить снова. Возвращает число перенесённых постов.
+    """
+    with transaction.atomic():
+        posts = list(
+            Post.objects.filter(pub_date__lt=before)
+            .order_by('pub_date', 'pk')[:batch_size]
+        )
+        if not posts:
+            return 0
+        ArchivedPost.objects.bulk_create([
+            ArchivedPost(id=post.id, text=post.text, pub_date=post.pub_date,
+                         author_id=post.author_id, group_id=post.group_id,
+                         image=post.image, excerpt=post.excerpt,
+                         has_more=post.has_more, text_html=post.text_html,
+                         excerpt_html=post.excerpt_html)
+            for post in posts
+        ], ignore_conflicts=True)
+        ArchivedComment.objects.bulk_create([
+            ArchivedComment(id=comment.id, text=comment.text,
+                            created=comment.created,
+                            post_id=comment.post_id,
+                            author_id=comment.author_id,
+                            text_html=comment.text_html)
+            for comment in Comment.objects.filter(post__in=posts)
+        ], ignore_conflicts=True)
+        with archiving():
+            Post.objects.filter(pk__in=[post.pk for post in posts]).delete()
+    mark_changed()
+    return len(posts)
@@ -0,0 +1,115 @@
+from collections import Counter
+from datetime import datetime
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.http import Http404
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import MonthlyPostCount
+
+SCOPE_ALL = 'all'
+
+
+def scope_for(group=None, author=None):
+    if group is not None:
+        return f'group:{group.pk}'
+    if author is not None:
+        return f'author:{author.pk}'
+    return SCOPE_ALL
+
+
+def post_scopes(post):
+    scopes = [SCOPE_ALL, f'author:{post.author_id}']
+    if post.group_id:
+        scopes.append(f'group:{post.group_id}')
+    return scopes
+
+
+def post_month(post):
+    local = timezone.localtime(post.pub_date)
+    return local.year, local.month
+
+
+def count_post(post, delta, scopes=None):
+    """Меняет помесячные счётчики записей на delta для всех лент поста
+    (или только для переданных scopes).
+    """
+    year, month = post_month(post)
+    if scopes is None:
+        scopes = post_scopes(post)
+    for scope in scopes:
+        counter = MonthlyPostCount.objects.filter(scope=scope, year=year,
+                                                  month=month)
+        if delta < 0:
+            counter.filter(posts_count__gte=-delta).update(
+                posts_count=F('posts_count') + delta)
+            continue
+        if counter.update(posts_count=F('posts_count') + delta):
+            continue
+        try:
+            with transaction.atomic():
+                MonthlyPostCount.objects.create(scope=scope, year=year,
+                                                month=month,
+                                                posts_count=delta)
+        except IntegrityError:
+            counter.update(posts_count=F('posts_count') + delta)
+
+
+def uncount_posts(posts):
+    """Уменьшает помесячные счётчики сразу для пачки удалённых постов,
+    одним UPDATE на каждую ленту и месяц.
+    """
+    deltas = Counter(
+        (scope, *post_month(post))
+        for post in posts for scope in post_scopes(post)
+    )
+    for (scope, year, month), count in deltas.items():
+        MonthlyPostCount.objects.filter(
+            scope=scope, year=year, month=month
+        ).update(posts_count=Greatest(F('posts_count') - count, 0))
+
+
+def month_bounds(year, month=None):
+    """Границы года или месяца для выборки по индексу pub_date."""
+    try:
+        if month is None:
+            start, end = datetime(year, 1, 1), datetime(year + 1, 1, 1)
+        elif month == 12:
+            start, end = datetime(year, 12, 1), datetime(year + 1, 1, 1)
+        else:
+            start = datetime(year, month, 1)
+            end = datetime(year, month + 1, 1)
+    except ValueError:
+        raise Http404
+    return timezone.make_aware(start), timezone.make_aware(end)
+
+
+def archive_url(year, month=None, group=None, author=None):
+    if group is not None:
+        name, args = 'group_archive', [group.slug, year]
+    elif author is not None:
+        name, args = 'profile_archive', [author.username, year]
+    else:
+        name, args = 'archive', [year]
+    if month is not None:
+        name += '_month'
+        args.append(month)
+    return reverse(name, args=args)
+
+
+def archive_months(group=None, author=None):
+    """Месяцы с записями для навигации по архиву ленты."""
+    counters = MonthlyPostCount.objects.filter(
+        scope=scope_for(group, author), posts_count__gt=0)
+    return [
+        {
+            'year': counter.year,
+            'month': counter.month,
+            'count': counter.posts_count,
+            'url': archive_url(counter.year, counter.month, group, author),
+        }
+        for counter in counters
+    ]
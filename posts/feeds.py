@@ -0,0 +1,29 @@
+from .models import ArchivedPost, Post
+from .paginator import CachedCountQuerySet, ChainedFeed
+from .purge import hide_purged
+
+
+def chained_feed(posts, archived_posts, key):
+    """Лента из постов и архивных постов со счётчиками в кэше под key."""
+    # Карточки в лентах показывают excerpt, полный текст не читается.
+    return ChainedFeed(hide_purged(posts).defer('text', 'text_html'),
+                       hide_purged(archived_posts).defer('text', 'text_html'),
+                       key)
+
+
+def linked_feed(posts, order_by, key):
+    """Лента тега или упоминаний без архивных постов."""
+    # Ленты тега и упоминаний сортируются по копии pub_date в таблице
+    # связей и читаются по её индексу.
+    return CachedCountQuerySet(
+        hide_purged(posts).defer('text', 'text_html').order_by(order_by),
+        key
+    )
+
+
+def index_feed():
+    """Лента главной страницы. Её же прогревает yatube.warmup, поэтому
+    ключ счётчиков в кэше у них общий.
+    """
+    return chained_feed(Post.objects.all(), ArchivedPost.objects.all(),
+                        'index')
@@ -0,0 +1,33 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from posts.archive import archive_batch
+
+
+class Command(BaseCommand):
+    help = ('Переносит старые посты с комментариями в архивные таблицы '
+            'небольшими порциями')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int,
+                            default=settings.POSTS_ARCHIVE_AFTER_DAYS,
+                            help='Переносить посты старше стольких дней')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Сколько постов переносить за транзакцию')
+        parser.add_argument('--pause', type=float, default=0.1,
+                            help='Пауза между порциями, с')
+
+    def handle(self, *args, **options):
+        before = timezone.now() - timedelta(days=options['days'])
+        archived = 0
+        while True:
+            moved = archive_batch(before, options['batch_size'])
+            if not moved:
+                break
+            archived += moved
+            time.sleep(options['pause'])
+        self.stdout.write(f'Перенесено в архив постов: {archived}')
@@ -0,0 +1,91 @@
+import statistics
+import timeit
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.core.paginator import Paginator
+from django.template.loader import render_to_string
+from django.test import RequestFactory, override_settings
+from django.utils import timezone
+
+from posts.forms import CommentForm
+from posts.markup import render_markup
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+# Рендер замеряется без фрагментного кэша, иначе {% cache %} в index.html
+# отдавал бы готовый HTML со второго повтора.
+DUMMY_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+    }
+}
+
+
+class Command(BaseCommand):
+    help = ('Замеряет время рендера index.html, profile.html и post.html '
+            'на заданном числе постов')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int,
+                            default=[10, 50, 100],
+                            help='Число постов (комментариев для post.html)')
+        parser.add_argument('--repeat', type=int, default=20,
+                            help='Сколько раз рендерить каждый шаблон')
+        parser.add_argument('--max-ms', type=float, default=None,
+                            help='Завершиться ошибкой, если медиана '
+                                 'превысит порог')
+
+    def handle(self, *args, **options):
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        slow = []
+        with override_settings(CACHES=DUMMY_CACHES):
+            for size in options['sizes']:
+                for template_name, context in self.contexts(size):
+                    timings = timeit.repeat(
+                        lambda: render_to_string(template_name, context,
+                                                 request),
+                        number=1, repeat=options['repeat'],
+                    )
+                    median = statistics.median(timings) * 1000
+                    best = min(timings) * 1000
+                    self.stdout.write(
+                        f'{template_name:<14} {size:>5} '
+                        f'median {median:8.2f} ms  min {best:8.2f} ms'
+                    )
+                    if (options['max_ms'] is not None
+                            and median > options['max_ms']):
+                        slow.append(f'{template_name} ({size})')
+        if slow:
+            raise CommandError(
+                'Рендер медленнее {} ms: {}'.format(
+                    options['max_ms'], ', '.join(slow)))
+
+    def contexts(self, size):
+        now = timezone.now()
+        author = User(id=1, username='bench', first_name='Bench',
+                      last_name='Author')
+        group = Group(id=1, title='Bench', slug='bench')
+        text = render_markup('Текст поста\nвторая строка')
+        posts = [
+            Post(id=i, excerpt_html=text, text_html=text, author=author,
+                 group=group, pub_date=now)
+            for i in range(1, size + 1)
+        ]
+        comments = [
+            Comment(id=i, text_html=render_markup(f'Комментарий {i}'),
+                    author=author, post=posts[0], created=now)
+            for i in range(1, size + 1)
+        ]
+        paginator = Paginator(posts, size)
+        page = paginator.get_page(1)
+        return [
+            ('index.html', {'page': page, 'paginator': paginator}),
+            ('profile.html', {'author': author, 'page': page,
+                              'paginator': paginator}),
+            ('post.html', {'post': posts[0], 'author': author,
+                           'comments': comments, 'form': CommentForm()}),
+        ]
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from posts.recommendations import build_recommendations, iter_user_batches
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает рекомендации «На кого подписаться» по графу подписок'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Сколько пользователей обрабатывать за раз')
+        parser.add_argument('--limit', type=int, default=None,
+                            help='Сколько рекомендаций хранить на '
+                                 'пользователя')
+
+    def handle(self, *args, **options):
+        users = 0
+        stored = 0
+        for user_ids in iter_user_batches(options['batch_size']):
+            stored += build_recommendations(user_ids, options['limit'])
+            users += len(user_ids)
+        self.stdout.write(
+            f'Пользователей: {users}, рекомендаций: {stored}')
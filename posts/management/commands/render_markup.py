@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+
+from posts.markup import fill_html
+from posts.models import ArchivedComment, ArchivedPost, Comment, Post
+from posts.tags import index_post
+
+# Модель, исходные поля и поля с готовым HTML.
+TARGETS = (
+    (Post, ('text', 'excerpt', 'has_more'), ('text_html', 'excerpt_html')),
+    (ArchivedPost, ('text', 'excerpt', 'has_more'),
+     ('text_html', 'excerpt_html')),
+    (Comment, ('text',), ('text_html',)),
+    (ArchivedComment, ('text',), ('text_html',)),
+)
+
+
+class Command(BaseCommand):
+    help = ('Заново строит сохранённый HTML постов и комментариев, '
+            'а также теги и упоминания постов, например после изменения '
+            'разметки')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Сколько строк обновлять за запрос')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        for model, sources, targets in TARGETS:
+            updated = 0
+            batch = []
+            rows = model.objects.only(*sources).order_by('pk')
+            for row in rows.iterator(chunk_size=batch_size):
+                batch.append(row)
+                if len(batch) == batch_size:
+                    fill_html(batch)
+                    model.objects.bulk_update(batch, targets)
+                    updated += len(batch)
+                    batch = []
+            fill_html(batch)
+            model.objects.bulk_update(batch, targets)
+            updated += len(batch)
+            self.stdout.write(f'{model.__name__}: обновлено {updated}')
+
+        indexed = 0
+        posts = Post.objects.only('text', 'pub_date').order_by('pk')
+        for post in posts.iterator(chunk_size=batch_size):
+            index_post(post)
+            indexed += 1
+        self.stdout.write(f'Теги и упоминания: обработано постов {indexed}')
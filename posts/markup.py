@@ -0,0 +1,83 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.template.defaultfilters import linebreaksbr
+from django.urls import reverse
+from django.utils.html import escape
+
+# Хэштег не должен продолжать слово, а в экранированном тексте — сущность
+# вида &#39;.
+TAG_RE = re.compile(r'(?<![\w&])#(\w+)')
+# Имя пользователя Django может содержать точки, плюсы и дефисы, но точка
+# в конце — это уже конец предложения.
+MENTION_RE = re.compile(r'(?<![\w@])@([\w.+-]*\w)')
+
+TAG_MAX_LENGTH = 100
+USERNAME_MAX_LENGTH = 150
+
+
+def extract_tags(text):
+    """Имена хэштегов из текста в нижнем регистре."""
+    return {name.lower() for name in TAG_RE.findall(text)
+            if len(name) <= TAG_MAX_LENGTH}
+
+
+def extract_mentions(text):
+    """Имена пользователей, упомянутых в тексте через @."""
+    return {username for username in MENTION_RE.findall(text)
+            if len(username) <= USERNAME_MAX_LENGTH}
+
+
+def existing_usernames(texts):
+    """Имена упомянутых в texts пользователей, которые есть в базе."""
+    usernames = set().union(*(extract_mentions(text) for text in texts))
+    if not usernames:
+        return set()
+    return set(get_user_model().objects.filter(
+        username__in=usernames).values_list('username', flat=True))
+
+
+def _tag_link(match):
+    url = reverse('tag', args=[match.group(1).lower()])
+    return f'<a href="{url}">#{match.group(1)}</a>'
+
+
+def _mention_link(match, usernames):
+    if match.group(1) not in usernames:
+        return match.group(0)
+    url = reverse('profile', args=[match.group(1)])
+    return f'<a href="{url}">@{match.group(1)}</a>'
+
+
+def render_markup(text, usernames=()):
+    """HTML тела поста или комментария, которое шаблоны выводят как есть:
+    экранированный текст со ссылками на хэштеги и упомянутых
+    пользователей и с <br> на месте переводов строк. Ссылками становятся
+    только упоминания из usernames (см. existing_usernames).
+    """
+    html = TAG_RE.sub(_tag_link, escape(text))
+    html = MENTION_RE.sub(lambda match: _mention_link(match, usernames),
+                          html)
+    return str(linebreaksbr(html, autoescape=False))
+
+
+def render_excerpt(excerpt, usernames=(), truncated=False):
+    """HTML начала текста. У обрезанного текста последнее слово перед
+    многоточием могло оборваться, поэтому оно остаётся без ссылки.
+    """
+    if not truncated:
+        return render_markup(excerpt, usernames)
+    head, tail = re.match(r'(.*?)(\S*)$', excerpt, re.DOTALL).groups()
+    return render_markup(head, usernames) + escape(tail)
+
+
+def fill_html(rows):
+    """Заполняет text_html (и excerpt_html у постов) у пачки постов или
+    комментариев. Упомянутые пользователи ищутся одним запросом на пачку.
+    """
+    usernames = existing_usernames([row.text for row in rows])
+    for row in rows:
+        row.text_html = render_markup(row.text, usernames)
+        if hasattr(row, 'excerpt_html'):
+            row.excerpt_html = render_excerpt(row.excerpt, usernames,
+                                              row.has_more)
@@ -0,0 +1,29 @@
+# Generated by Django 2.2.6 on 2026-10-19 09:44
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def remove_duplicate_follows(apps, schema_editor):
+    Follow = apps.get_model('posts', 'Follow')
+    # Подзапрос с GROUP BY вместо списка id: на большой таблице список
+    # не поместится в параметры запроса.
+    keep = (Follow.objects.order_by().values('user', 'author')
+            .annotate(keep_id=Min('id')).values('keep_id'))
+    Follow.objects.exclude(id__in=keep).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_trendingpost'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_follows,
+                             migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.UniqueConstraint(fields=('user', 'author'), name='unique_subscriber'),
+        ),
+    ]
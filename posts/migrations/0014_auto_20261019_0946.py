@@ -0,0 +1,59 @@
+# Generated by Django 2.2.6 on 2026-10-19 09:46
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils.text import Truncator
+
+
+def fill_group_stats(apps, schema_editor):
+    Group = apps.get_model('posts', 'Group')
+    GroupStats = apps.get_model('posts', 'GroupStats')
+    Post = apps.get_model('posts', 'Post')
+    for group in Group.objects.iterator():
+        posts = Post.objects.filter(group=group)
+        last_post = posts.order_by('-pub_date').first()
+        GroupStats.objects.create(
+            group=group,
+            posts_count=posts.count(),
+            last_post=last_post,
+            last_post_date=last_post.pub_date if last_post else None,
+            last_post_excerpt=(Truncator(last_post.text).chars(150)
+                               if last_post else ''),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_auto_20261019_0944'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GroupStats',
+            fields=[
+                ('group', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='posts.Group', verbose_name='Группа')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Количество записей')),
+                ('last_post_date', models.DateTimeField(blank=True, null=True, verbose_name='Дата последней записи')),
+                ('last_post_excerpt', models.CharField(blank=True, max_length=200, verbose_name='Начало последней записи')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='group',
+            index=models.Index(fields=['title'], name='group_title_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['group', '-pub_date'], name='post_group_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', '-pub_date'], name='post_author_pub_date_idx'),
+        ),
+        migrations.AddField(
+            model_name='groupstats',
+            name='last_post',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='posts.Post', verbose_name='Последняя запись'),
+        ),
+        migrations.RunPython(fill_group_stats, migrations.RunPython.noop),
+    ]
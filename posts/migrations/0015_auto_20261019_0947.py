@@ -0,0 +1,54 @@
+# Generated by Django 2.2.6 on 2026-10-19 09:47
+
+from collections import Counter
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def fill_monthly_post_counts(apps, schema_editor):
+    MonthlyPostCount = apps.get_model('posts', 'MonthlyPostCount')
+    Post = apps.get_model('posts', 'Post')
+    counts = Counter()
+    posts = Post.objects.values_list('pub_date', 'author_id', 'group_id')
+    for pub_date, author_id, group_id in posts.iterator():
+        local = timezone.localtime(pub_date)
+        scopes = ['all', f'author:{author_id}']
+        if group_id:
+            scopes.append(f'group:{group_id}')
+        for scope in scopes:
+            counts[scope, local.year, local.month] += 1
+    MonthlyPostCount.objects.bulk_create(
+        MonthlyPostCount(scope=scope, year=year, month=month,
+                         posts_count=count)
+        for (scope, year, month), count in counts.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_auto_20261019_0946'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyPostCount',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(max_length=50, verbose_name='Лента')),
+                ('year', models.PositiveSmallIntegerField(verbose_name='Год')),
+                ('month', models.PositiveSmallIntegerField(verbose_name='Месяц')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Количество записей')),
+            ],
+            options={
+                'ordering': ['-year', '-month'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='monthlypostcount',
+            constraint=models.UniqueConstraint(fields=('scope', 'year', 'month'), name='unique_monthly_post_count'),
+        ),
+        migrations.RunPython(fill_monthly_post_counts,
+                             migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 2.2.6 on 2026-10-19 10:02
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils.text import Truncator
+
+BATCH_SIZE = 500
+
+
+def fill_excerpts(apps, schema_editor):
+    for model_name in ('Post', 'ArchivedPost'):
+        model = apps.get_model('posts', model_name)
+        batch = []
+        for post in model.objects.only('text').iterator():
+            post.excerpt = Truncator(post.text).chars(
+                settings.POST_EXCERPT_LENGTH)
+            post.has_more = post.excerpt != post.text
+            batch.append(post)
+            if len(batch) == BATCH_SIZE:
+                model.objects.bulk_update(batch, ['excerpt', 'has_more'])
+                batch = []
+        model.objects.bulk_update(batch, ['excerpt', 'has_more'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_purge'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedpost',
+            name='excerpt',
+            field=models.TextField(blank=True, verbose_name='Начало текста'),
+        ),
+        migrations.AddField(
+            model_name='archivedpost',
+            name='has_more',
+            field=models.BooleanField(default=False, verbose_name='Текст длиннее начала'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='excerpt',
+            field=models.TextField(blank=True, editable=False, verbose_name='Начало текста'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='has_more',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Текст длиннее начала'),
+        ),
+        migrations.RunPython(fill_excerpts, migrations.RunPython.noop),
+    ]
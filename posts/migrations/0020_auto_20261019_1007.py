@@ -0,0 +1,122 @@
+# Generated by Django 2.2.6 on 2026-10-19 10:07
+
+import re
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+BATCH_SIZE = 500
+
+# Копия разметки из posts.markup на момент миграции: её дальнейшие
+# изменения не должны менять результат уже написанной миграции.
+TAG_RE = re.compile(r'(?<![\w&])#(\w+)')
+MENTION_RE = re.compile(r'(?<![\w@])@([\w.+-]*\w)')
+TAG_MAX_LENGTH = 100
+USERNAME_MAX_LENGTH = 150
+
+
+def extract_tags(text):
+    return {name.lower() for name in TAG_RE.findall(text)
+            if len(name) <= TAG_MAX_LENGTH}
+
+
+def extract_mentions(text):
+    return {username for username in MENTION_RE.findall(text)
+            if len(username) <= USERNAME_MAX_LENGTH}
+
+
+def _index(apps, posts):
+    Tag = apps.get_model('posts', 'Tag')
+    PostTag = apps.get_model('posts', 'PostTag')
+    Mention = apps.get_model('posts', 'Mention')
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+
+    names = {post.pk: extract_tags(post.text) for post in posts}
+    usernames = {post.pk: extract_mentions(post.text) for post in posts}
+    all_names = set().union(*names.values())
+    Tag.objects.bulk_create([Tag(name=name) for name in all_names],
+                            ignore_conflicts=True)
+    tags = dict(Tag.objects.filter(name__in=all_names).values_list('name',
+                                                                  'pk'))
+    users = dict(User.objects.filter(
+        username__in=set().union(*usernames.values())
+    ).values_list('username', 'pk'))
+    PostTag.objects.bulk_create([
+        PostTag(post_id=post.pk, tag_id=tags[name], pub_date=post.pub_date)
+        for post in posts for name in names[post.pk]
+    ], ignore_conflicts=True)
+    Mention.objects.bulk_create([
+        Mention(post_id=post.pk, user_id=users[username],
+                pub_date=post.pub_date)
+        for post in posts for username in usernames[post.pk]
+        if username in users
+    ], ignore_conflicts=True)
+
+
+def index_posts(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    batch = []
+    posts = Post.objects.only('text', 'pub_date').order_by('pk')
+    for post in posts.iterator():
+        batch.append(post)
+        if len(batch) == BATCH_SIZE:
+            _index(apps, batch)
+            batch = []
+    _index(apps, batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0019_auto_20261019_1004'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Тег')),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PostTag',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pub_date', models.DateTimeField(verbose_name='Дата публикации')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='post_tags', to='posts.Post', verbose_name='Пост')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='post_tags', to='posts.Tag', verbose_name='Тег')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Mention',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pub_date', models.DateTimeField(verbose_name='Дата публикации')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mentions', to='posts.Post', verbose_name='Пост')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mentions', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='posttag',
+            index=models.Index(fields=['tag', '-pub_date'], name='post_tag_pub_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='posttag',
+            constraint=models.UniqueConstraint(fields=('post', 'tag'), name='unique_post_tag'),
+        ),
+        migrations.AddIndex(
+            model_name='mention',
+            index=models.Index(fields=['user', '-pub_date'], name='mention_user_pub_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='mention',
+            constraint=models.UniqueConstraint(fields=('post', 'user'), name='unique_mention'),
+        ),
+        migrations.RunPython(index_posts, migrations.RunPython.noop),
+    ]
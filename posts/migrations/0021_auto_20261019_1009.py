@@ -0,0 +1,39 @@
+# Generated by Django 2.2.6 on 2026-10-19 10:09
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0020_auto_20261019_1007'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('comment', 'Комментарий к записи'), ('follow', 'Новый подписчик')], max_length=10, verbose_name='Событие')),
+                ('post_id', models.PositiveIntegerField(blank=True, null=True, verbose_name='Номер записи')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Дата')),
+                ('read', models.BooleanField(default=False, verbose_name='Прочитано')),
+                ('actor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Автор события')),
+                ('recipient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to=settings.AUTH_USER_MODEL, verbose_name='Получатель')),
+            ],
+            options={
+                'ordering': ['-created'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['recipient', '-created'], name='notification_recipient_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(read=False), fields=['recipient'], name='notification_unread_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 2.2.6 on 2026-10-19 10:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0021_auto_20261019_1009'),
+    ]
+
+    # Меняются только help_text и editable, схема таблиц прежняя: без
+    # SeparateDatabaseAndState SQLite пересобрал бы таблицы архива.
+    operations = [
+        migrations.SeparateDatabaseAndState(state_operations=[
+            migrations.AlterField(
+                model_name='archivedcomment',
+                name='text_html',
+                field=models.TextField(blank=True, editable=False, verbose_name='HTML комментария'),
+            ),
+            migrations.AlterField(
+                model_name='archivedpost',
+                name='excerpt',
+                field=models.TextField(blank=True, editable=False, verbose_name='Начало текста'),
+            ),
+            migrations.AlterField(
+                model_name='archivedpost',
+                name='excerpt_html',
+                field=models.TextField(blank=True, editable=False, verbose_name='HTML начала текста'),
+            ),
+            migrations.AlterField(
+                model_name='archivedpost',
+                name='has_more',
+                field=models.BooleanField(default=False, editable=False, verbose_name='Текст длиннее начала'),
+            ),
+            migrations.AlterField(
+                model_name='archivedpost',
+                name='text',
+                field=models.TextField(help_text='Поле для текста записи', verbose_name='Текст'),
+            ),
+            migrations.AlterField(
+                model_name='archivedpost',
+                name='text_html',
+                field=models.TextField(blank=True, editable=False, verbose_name='HTML текста'),
+            ),
+        ]),
+    ]
@@ -1,22 +1,70 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import connections, models
+from django.utils.text import Truncator
+
+from .markup import existing_usernames, render_excerpt, render_markup
 
 User = get_user_model()
 
 
+def make_excerpt(text):
+    """Начало текста для лент длиной до POST_EXCERPT_LENGTH символов."""
+    return Truncator(text).chars(settings.POST_EXCERPT_LENGTH)
+
+
 class Group(models.Model):
     title = models.CharField(max_length=200, verbose_name='Название группы',
                              help_text='Выберите группу')
     slug = models.SlugField(unique=True, verbose_name='Адрес группы')
     description = models.TextField(verbose_name='Описание группы')
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['title'], name='group_title_idx'),
+        ]
+
     def __str__(self):
         return self.title
 
 
-class Post(models.Model):
+class BasePost(models.Model):
+    """Общие поля постов на сайте и в архиве."""
     text = models.TextField(verbose_name='Текст', blank=False,
                             help_text='Поле для текста записи')
+    image = models.ImageField(upload_to='posts/', blank=True, null=True,
+                              verbose_name='Изображение')
+    # Ленты читают только начало текста, полный текст загружается
+    # на странице поста.
+    excerpt = models.TextField('Начало текста', blank=True, editable=False)
+    has_more = models.BooleanField('Текст длиннее начала', default=False,
+                                   editable=False)
+    # HTML текста и его начала, готовый к выводу в шаблонах.
+    text_html = models.TextField('HTML текста', blank=True, editable=False)
+    excerpt_html = models.TextField('HTML начала текста', blank=True,
+                                    editable=False)
+
+    class Meta:
+        abstract = True
+
+    def __str__(self):
+        return self.text[:15]
+
+    def save(self, *args, **kwargs):
+        self.excerpt = make_excerpt(self.text)
+        self.has_more = self.excerpt != self.text
+        usernames = existing_usernames([self.text])
+        self.text_html = render_markup(self.text, usernames)
+        self.excerpt_html = render_excerpt(self.excerpt, usernames,
+                                           self.has_more)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'text' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'excerpt', 'has_more',
+                                       'text_html', 'excerpt_html'}
+        super().save(*args, **kwargs)
+
+
+class Post(BasePost):
     pub_date = models.DateTimeField('Дата публикации', auto_now_add=True,
                                     db_index=True)
     author = models.ForeignKey(User, on_delete=models.CASCADE,
@@ -26,18 +74,50 @@ class Post(models.Model):
                               verbose_name='Группа',
                               help_text='Группа, в которую можно добавить '
                                         'запись')
-    image = models.ImageField(upload_to='posts/', blank=True, null=True,
-                              verbose_name='Изображение')
+
+    is_archived = False
 
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(fields=['group', '-pub_date'],
+                         name='post_group_pub_date_idx'),
+            models.Index(fields=['author', '-pub_date'],
+                         name='post_author_pub_date_idx'),
+        ]
 
-    def __str__(self):
-        return self.text[:15]
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Группа на момент загрузки нужна сигналам, чтобы при смене группы
+        # поправить счётчики обеих.
+        instance._loaded_group_id = instance.__dict__.get('group_id')
+        return instance
 
 
-class Comment(models.Model):
+class BaseComment(models.Model):
+    """Общие поля комментариев на сайте и в архиве."""
     text = models.TextField(verbose_name='Комментарий', blank=False)
+    text_html = models.TextField('HTML комментария', blank=True,
+                                 editable=False)
+
+    class Meta:
+        abstract = True
+        ordering = ['created']
+
+    def __str__(self):
+        return self.text
+
+    def save(self, *args, **kwargs):
+        self.text_html = render_markup(self.text,
+                                       existing_usernames([self.text]))
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'text' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'text_html'}
+        super().save(*args, **kwargs)
+
+
+class Comment(BaseComment):
     created = models.DateTimeField('Дата и время комментария',
                                    auto_now_add=True, db_index=True)
     post = models.ForeignKey(Post, on_delete=models.CASCADE,
@@ -45,11 +125,88 @@ class Comment(models.Model):
     author = models.ForeignKey(User, on_delete=models.CASCADE,
                                related_name='comments', verbose_name='Автор')
 
+
+class ArchivedPost(BasePost):
+    """Пост, перенесённый из posts_post командой archive_posts.
+
+    id сохраняется, поэтому старые ссылки на пост продолжают работать.
+    Архивные записи только читаются.
+    """
+    id = models.IntegerField(primary_key=True)
+    pub_date = models.DateTimeField('Дата публикации', db_index=True)
+    author = models.ForeignKey(User, on_delete=models.CASCADE,
+                               related_name='archived_posts',
+                               verbose_name='Автор')
+    group = models.ForeignKey(Group, blank=True, null=True,
+                              on_delete=models.CASCADE,
+                              related_name='archived_posts',
+                              verbose_name='Группа')
+    archived = models.DateTimeField('Дата переноса в архив',
+                                    auto_now_add=True)
+
+    is_archived = True
+
     class Meta:
-        ordering = ['created']
+        ordering = ['-pub_date']
+        indexes = [
+            models.Index(fields=['group', '-pub_date'],
+                         name='archived_group_pub_date_idx'),
+            models.Index(fields=['author', '-pub_date'],
+                         name='archived_author_pub_date_idx'),
+        ]
 
-    def __str__(self):
-        return self.text
+
+class ArchivedComment(BaseComment):
+    id = models.IntegerField(primary_key=True)
+    created = models.DateTimeField('Дата и время комментария',
+                                   db_index=True)
+    post = models.ForeignKey(ArchivedPost, on_delete=models.CASCADE,
+                             related_name='comments', verbose_name='Пост')
+    author = models.ForeignKey(User, on_delete=models.CASCADE,
+                               related_name='archived_comments',
+                               verbose_name='Автор')
+
+
+class FollowManager(models.Manager):
+    def follow(self, user, usernames):
+        """Подписывает user на авторов одним INSERT ... SELECT по username.
+        Уже существующие подписки, подписка на себя, несуществующие
+        и удаляемые (Purge) авторы пропускаются. Возвращает число новых
+        подписок.
+        """
+        usernames = list(usernames)
+        if not usernames:
+            return 0
+        connection = connections[self.db]
+        ops = connection.ops
+        qn = ops.quote_name
+        opts = self.model._meta
+        user_pk = User._meta.pk.column
+        user_table = qn(User._meta.db_table)
+        purge_table = qn(Purge._meta.db_table)
+        purge_user = qn(Purge._meta.get_field('user').column)
+        placeholders = ', '.join(['%s'] * len(usernames))
+        sql = (
+            f'{ops.insert_statement(ignore_conflicts=True)} '
+            f'{qn(opts.db_table)} ({qn(opts.get_field("user").column)}, '
+            f'{qn(opts.get_field("author").column)}) '
+            f'SELECT %s, {qn(user_pk)} FROM {user_table} '
+            f'WHERE {qn(User._meta.get_field(User.USERNAME_FIELD).column)} '
+            f'IN ({placeholders}) AND {qn(user_pk)} <> %s '
+            f'AND NOT EXISTS (SELECT 1 FROM {purge_table} '
+            f'WHERE {purge_table}.{purge_user} = '
+            f'{user_table}.{qn(user_pk)}) '
+            f'{ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)}'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [user.pk, *usernames, user.pk])
+            return cursor.rowcount
+
+    def unfollow(self, user, usernames):
+        """Удаляет подписки user на авторов одним DELETE по username."""
+        deleted, _ = self.filter(user=user,
+                                 author__username__in=list(usernames)).delete()
+        return deleted
 
 
 class Follow(models.Model):
@@ -57,3 +214,175 @@ class Follow(models.Model):
                              related_name='follower')
     author = models.ForeignKey(User, on_delete=models.CASCADE,
                                related_name='following')
+
+    objects = FollowManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=('user', 'author'),
+                                    name='unique_subscriber'),
+        ]
+
+
+class FollowRecommendation(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE,
+                             related_name='recommendations',
+                             verbose_name='Пользователь')
+    author = models.ForeignKey(User, on_delete=models.CASCADE,
+                               related_name='recommended_to',
+                               verbose_name='Рекомендуемый автор')
+    score = models.FloatField('Оценка')
+    common_follows = models.PositiveIntegerField(
+        'Подписчиков среди ваших подписок')
+
+    class Meta:
+        ordering = ['user', '-score']
+        constraints = [
+            models.UniqueConstraint(fields=('user', 'author'),
+                                    name='unique_recommendation'),
+        ]
+
+
+class TrendingPost(models.Model):
+    post = models.OneToOneField(Post, on_delete=models.CASCADE,
+                                primary_key=True, related_name='trending',
+                                verbose_name='Пост')
+    score = models.FloatField('Оценка', db_index=True)
+    updated = models.DateTimeField('Обновлено', auto_now=True)
+
+    class Meta:
+        ordering = ['-score']
+
+
+class GroupStats(models.Model):
+    group = models.OneToOneField(Group, on_delete=models.CASCADE,
+                                 primary_key=True, related_name='stats',
+                                 verbose_name='Группа')
+    posts_count = models.PositiveIntegerField('Количество записей',
+                                              default=0)
+    last_post = models.ForeignKey(Post, on_delete=models.SET_NULL,
+                                  blank=True, null=True, related_name='+',
+                                  verbose_name='Последняя запись')
+    last_post_date = models.DateTimeField('Дата последней записи',
+                                          blank=True, null=True)
+    last_post_excerpt = models.CharField('Начало последней записи',
+                                         max_length=200, blank=True)
+
+
+class MonthlyPostCount(models.Model):
+    # Лента, к которой относится счётчик: 'all', 'group:<id>' или
+    # 'author:<id>'.
+    scope = models.CharField('Лента', max_length=50)
+    year = models.PositiveSmallIntegerField('Год')
+    month = models.PositiveSmallIntegerField('Месяц')
+    posts_count = models.PositiveIntegerField('Количество записей',
+                                              default=0)
+
+    class Meta:
+        ordering = ['-year', '-month']
+        constraints = [
+            models.UniqueConstraint(fields=('scope', 'year', 'month'),
+                                    name='unique_monthly_post_count'),
+        ]
+
+
+class Tag(models.Model):
+    name = models.CharField('Тег', max_length=100, unique=True)
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+
+class PostTag(models.Model):
+    """Хэштег в тексте поста; заполняется при сохранении поста."""
+    post = models.ForeignKey(Post, on_delete=models.CASCADE,
+                             related_name='post_tags', verbose_name='Пост')
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE,
+                            related_name='post_tags', verbose_name='Тег')
+    # Копия даты поста: лента тега читается по индексу (tag, -pub_date)
+    # без сортировки постов.
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=('post', 'tag'),
+                                    name='unique_post_tag'),
+        ]
+        indexes = [
+            models.Index(fields=['tag', '-pub_date'],
+                         name='post_tag_pub_date_idx'),
+        ]
+
+
+class Mention(models.Model):
+    """Упоминание пользователя через @ в тексте поста."""
+    post = models.ForeignKey(Post, on_delete=models.CASCADE,
+                             related_name='mentions', verbose_name='Пост')
+    user = models.ForeignKey(User, on_delete=models.CASCADE,
+                             related_name='mentions',
+                             verbose_name='Пользователь')
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=('post', 'user'),
+                                    name='unique_mention'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-pub_date'],
+                         name='mention_user_pub_date_idx'),
+        ]
+
+
+class Notification(models.Model):
+    COMMENT = 'comment'
+    FOLLOW = 'follow'
+    KINDS = (
+        (COMMENT, 'Комментарий к записи'),
+        (FOLLOW, 'Новый подписчик'),
+    )
+
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE,
+                                  related_name='notifications',
+                                  verbose_name='Получатель')
+    actor = models.ForeignKey(User, on_delete=models.CASCADE,
+                              related_name='+', verbose_name='Автор события')
+    kind = models.CharField('Событие', max_length=10, choices=KINDS)
+    # Номер поста без внешнего ключа: пост может уйти в архив, а ссылка
+    # на него должна остаться рабочей.
+    post_id = models.PositiveIntegerField('Номер записи', blank=True,
+                                          null=True)
+    created = models.DateTimeField('Дата', auto_now_add=True)
+    read = models.BooleanField('Прочитано', default=False)
+
+    class Meta:
+        ordering = ['-created']
+        indexes = [
+            models.Index(fields=['recipient', '-created'],
+                         name='notification_recipient_idx'),
+            # Частичный индекс для подсчёта непрочитанных.
+            models.Index(fields=['recipient'],
+                         condition=models.Q(read=False),
+                         name='notification_unread_idx'),
+        ]
+
+
+class Purge(models.Model):
+    """Отметка об удалении пользователя или группы.
+
+    Отмеченный объект сразу скрывается с сайта, а зависимые записи
+    удаляет порциями фоновая задача posts.tasks.purge.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, blank=True,
+                                null=True, related_name='purge',
+                                verbose_name='Пользователь')
+    group = models.OneToOneField(Group, on_delete=models.CASCADE,
+                                 blank=True, null=True, related_name='purge',
+                                 verbose_name='Группа')
+    created = models.DateTimeField('Дата отметки', auto_now_add=True)
+
+    def __str__(self):
+        return str(self.user or self.group)
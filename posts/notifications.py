@@ -0,0 +1,67 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from yatube.caches import shared_cache
+
+from .models import Notification, Purge
+
+
+def unread_key(user_id):
+    return f'notifications_unread:{user_id}'
+
+
+def _counts_cache():
+    # Уведомления создаёт процесс run_workers, а счётчики читают
+    # веб-процессы, поэтому увеличивать счётчик имеет смысл только в общем
+    # кэше. Без него каждый процесс держит свою копию не дольше
+    # NOTIFICATIONS_COUNT_TTL секунд.
+    return shared_cache() or cache
+
+
+def notify(recipient_ids, actor_id, kind, post_id=None):
+    """Создаёт уведомления и увеличивает счётчики непрочитанных в общем
+    кэше, если он настроен. Уведомления о собственных действиях
+    не создаются.
+    """
+    recipient_ids = [pk for pk in recipient_ids if pk != actor_id]
+    Notification.objects.bulk_create([
+        Notification(recipient_id=pk, actor_id=actor_id, kind=kind,
+                     post_id=post_id)
+        for pk in recipient_ids
+    ])
+    store = shared_cache()
+    if store is None:
+        return
+    for pk in recipient_ids:
+        try:
+            store.incr(unread_key(pk))
+        except ValueError:
+            # Счётчика нет в кэше: его посчитает следующий запрос.
+            pass
+
+
+def unread_count(user):
+    """Число непрочитанных уведомлений из кэша, при промахе — COUNT(*)
+    по частичному индексу.
+    """
+    store = _counts_cache()
+    key = unread_key(user.pk)
+    count = store.get(key)
+    if count is None:
+        # Отмеченные к удалению авторы событий отсеиваются подзапросом
+        # к posts_purge, без соединения с auth_user.
+        count = Notification.objects.filter(recipient=user, read=False).exclude(
+            actor_id__in=Purge.objects.filter(
+                user__isnull=False).values('user_id')
+        ).count()
+        store.set(key, count, settings.NOTIFICATIONS_COUNT_TTL)
+    return count
+
+
+def mark_read(user, notifications):
+    """Отмечает прочитанными показанные уведомления пользователя."""
+    pks = [notification.pk for notification in notifications
+           if not notification.read]
+    if pks:
+        Notification.objects.filter(pk__in=pks).update(read=True)
+        _counts_cache().delete(unread_key(user.pk))
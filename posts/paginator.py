@@ -0,0 +1,142 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+from yatube.caches import shared_cache
+
+# Время последнего изменения числа постов в лентах ChainedFeed.
+CHANGED_KEY = 'posts_count:changed'
+
+
+def mark_changed():
+    """Отмечает, что посты добавились, удалились или ушли в архив:
+    кэшированные числа записей ChainedFeed, посчитанные раньше,
+    пересчитываются на следующем запросе. Отметка хранится в общем кэше,
+    если он настроен, иначе её видит только текущий процесс.
+    """
+    (shared_cache() or cache).set(CHANGED_KEY, time.time(), None)
+
+
+def _changed_at():
+    return (shared_cache() or cache).get(CHANGED_KEY)
+
+
+class CachedCountQuerySet:
+    """Обёртка над QuerySet для Paginator, которая берёт общее число
+    записей из cached_count вместо COUNT(*) на каждый запрос.
+    """
+
+    def __init__(self, queryset, key):
+        self.queryset = queryset
+        self.key = f'posts_count:{key}'
+
+    @property
+    def ordered(self):
+        return self.queryset.ordered
+
+    def count(self):
+        return cached_count(self.queryset, self.key)
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, item):
+        return self.queryset[item]
+
+
+class ChainedFeed:
+    """Лента для Paginator из свежих постов и архива: сначала идут записи
+    hot, за ними cold. Обе выборки упорядочены по -pub_date, а в архиве
+    лежат только посты старше оставшихся в hot.
+
+    Число записей в обеих частях берётся из cached_count и пересчитывается
+    после mark_changed. Граница частей при выборке страницы проверяется
+    по самим свежим постам, поэтому устаревшее число (например, в другом
+    процессе без общего кэша) не пропускает и не повторяет посты.
+    """
+
+    def __init__(self, hot, cold, key):
+        self.hot = hot
+        self.cold = cold
+        self.hot_key = f'posts_count:{key}'
+        self.key = f'posts_count:{key}:archive'
+        self._hot_count = None
+
+    ordered = True
+
+    @property
+    def hot_count(self):
+        if self._hot_count is None:
+            self._hot_count = cached_count(self.hot, self.hot_key,
+                                           _changed_at())
+        return self._hot_count
+
+    def count(self):
+        return self.hot_count + cached_count(self.cold, self.key,
+                                             _changed_at())
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, item):
+        start, stop = item.start or 0, item.stop
+        # Свежие посты запрашиваются и за кэшированной границей: после неё
+        # могли появиться новые, и лента переходит к архиву, только когда
+        # свежие посты действительно кончились.
+        rows = list(self.hot[start:stop])
+        if len(rows) == stop - start:
+            return rows
+        if rows:
+            split = start + len(rows)
+        else:
+            # Страница целиком в архиве, её начало зависит от точного
+            # числа свежих постов.
+            split = self.hot.count()
+        if split != self.hot_count:
+            self._hot_count = store_count(self.hot_key, split)
+        return rows + list(self.cold[max(start - split, 0):stop - split])
+
+
+def cached_count(queryset, key, changed_at=None):
+    """Точный COUNT(*) для небольших выборок. Если записей не меньше
+    PAGINATOR_COUNT_THRESHOLD, число кэшируется и отдаётся из кэша,
+    а устаревшее значение пересчитывается в фоновом потоке. Число,
+    посчитанное раньше changed_at, пересчитывается сразу.
+    """
+    cached = cache.get(key)
+    if cached is None:
+        return refresh_count(queryset, key)
+    count, counted_at = cached
+    if changed_at is not None and counted_at < changed_at:
+        return refresh_count(queryset, key)
+    if time.time() - counted_at > settings.PAGINATOR_COUNT_TTL:
+        # Пересчёт запускает только один поток, остальные запросы
+        # продолжают получать прежнее значение.
+        if cache.add(f'{key}:lock', True, settings.PAGINATOR_COUNT_TTL):
+            threading.Thread(target=_refresh_in_background,
+                             args=(queryset.all(), key),
+                             daemon=True).start()
+    return count
+
+
+def refresh_count(queryset, key):
+    return store_count(key, queryset.count())
+
+
+def store_count(key, count):
+    if count >= settings.PAGINATOR_COUNT_THRESHOLD:
+        cache.set(key, (count, time.time()), None)
+    else:
+        cache.delete(key)
+    return count
+
+
+def _refresh_in_background(queryset, key):
+    try:
+        refresh_count(queryset, key)
+    finally:
+        cache.delete(f'{key}:lock')
+        connection.close()
@@ -0,0 +1,85 @@
+from collections import Counter
+
+from django.db import transaction
+
+from . import date_archive, stats
+from .models import (ArchivedComment, ArchivedPost, Comment, Follow,
+                     FollowRecommendation, Mention, MonthlyPostCount,
+                     Notification, Post, PostTag)
+from .paginator import mark_changed
+
+
+def hide_purged(posts):
+    """Убирает из выборки посты удаляемых авторов и групп."""
+    return posts.filter(author__purge__isnull=True,
+                        group__purge__isnull=True)
+
+
+def _user_rows(user):
+    return [
+        Comment.objects.filter(post__author=user),
+        Comment.objects.filter(author=user),
+        ArchivedComment.objects.filter(post__author=user),
+        ArchivedComment.objects.filter(author=user),
+        Follow.objects.filter(user=user),
+        Follow.objects.filter(author=user),
+        FollowRecommendation.objects.filter(user=user),
+        FollowRecommendation.objects.filter(author=user),
+        PostTag.objects.filter(post__author=user),
+        Mention.objects.filter(post__author=user),
+        Mention.objects.filter(user=user),
+        Notification.objects.filter(recipient=user),
+        Notification.objects.filter(actor=user),
+        Post.objects.filter(author=user),
+        ArchivedPost.objects.filter(author=user),
+        MonthlyPostCount.objects.filter(scope=f'author:{user.pk}'),
+    ]
+
+
+def _group_rows(group):
+    return [
+        Comment.objects.filter(post__group=group),
+        ArchivedComment.objects.filter(post__group=group),
+        PostTag.objects.filter(post__group=group),
+        Mention.objects.filter(post__group=group),
+        Post.objects.filter(group=group),
+        ArchivedPost.objects.filter(group=group),
+        MonthlyPostCount.objects.filter(scope=f'group:{group.pk}'),
+    ]
+
+
+def _uncount_archived(posts):
+    # Архивные посты удаляются без сигналов, поэтому помесячные счётчики
+    # и счётчики групп уменьшаются здесь.
+    posts = list(posts)
+    date_archive.uncount_posts(posts)
+    removed = Counter(post.group_id for post in posts if post.group_id)
+    for group_id, count in removed.items():
+        stats.group_posts_removed(group_id, count)
+
+
+def purge_batch(mark, batch_size):
+    """Удаляет не больше batch_size зависимых записей отмеченного объекта.
+
+    Когда зависимых записей не осталось, удаляет сам объект вместе
+    с отметкой. Возвращает True, если удаление ещё не закончено.
+    """
+    if mark.user_id:
+        target, rows = mark.user, _user_rows(mark.user)
+    else:
+        target, rows = mark.group, _group_rows(mark.group)
+    for queryset in rows:
+        pks = list(queryset.order_by()
+                   .values_list('pk', flat=True)[:batch_size])
+        if pks:
+            batch = queryset.model.objects.filter(pk__in=pks)
+            with transaction.atomic():
+                if queryset.model is ArchivedPost:
+                    _uncount_archived(
+                        batch.only('pub_date', 'author_id', 'group_id'))
+                batch.delete()
+            if queryset.model is ArchivedPost:
+                mark_changed()
+            return True
+    target.delete()
+    return False
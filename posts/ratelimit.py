@@ -0,0 +1,118 @@
+import math
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.core.cache import cache
+from django.shortcuts import render
+
+from yatube.caches import shared_cache
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    limit, period = rate.split('/')
+    return int(limit), PERIODS[period]
+
+
+def ratelimit(scope, methods=None, cost=None):
+    """Ограничивает частоту запросов к view отдельно для каждого
+    пользователя и IP-адреса. Лимит берётся из RATELIMITS[scope]
+    в формате «число/период» (s, m, h, d). cost(request) — сколько
+    действий из лимита расходует запрос, по умолчанию одно.
+
+    Пользователь определяется по сессии без загрузки auth_user, поэтому
+    лишние запросы отклоняются с кодом 429 до любой работы с моделями.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if methods is None or request.method in methods:
+                retry_after = consume_token(
+                    request, scope, cost(request) if cost else 1)
+                if retry_after:
+                    response = render(request, 'misc/429.html', status=429)
+                    response['Retry-After'] = retry_after
+                    return response
+            return view_func(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def client_ip(request):
+    """Адрес клиента. За RATELIMIT_PROXY_COUNT обратными прокси он
+    берётся из X-Forwarded-For: каждый прокси дописывает в конец адрес,
+    от которого получил запрос, а более ранние записи мог подставить
+    сам клиент.
+    """
+    proxies = settings.RATELIMIT_PROXY_COUNT
+    if proxies:
+        header = request.META.get('HTTP_X_FORWARDED_FOR', '')
+        forwarded = [address.strip() for address in header.split(',')
+                     if address.strip()]
+        if len(forwarded) >= proxies:
+            return forwarded[-proxies]
+    return request.META.get('REMOTE_ADDR')
+
+
+def consume_token(request, scope, cost=1):
+    """Учитывает cost действий в счётчиках пользователя и IP и возвращает
+    число секунд до следующего разрешённого запроса, если лимит превышен,
+    иначе 0. Запрос дороже всего лимита расходует весь лимит.
+
+    Лимит считается скользящим окном: к числу запросов в текущем окне
+    длиной в период добавляется доля запросов прошлого окна, пропорционально
+    тому, какая его часть ещё попадает в последние period секунд. Счётчики
+    окон создаются через add и увеличиваются через incr, поэтому даже
+    одновременные запросы не пропускают больше limit.
+
+    Счётчики хранятся в общем кэше, а без SHARED_CACHE_LOCATION — в кэше
+    процесса, и тогда лимит действует в каждом процессе отдельно.
+    """
+    rate = settings.RATELIMITS.get(scope)
+    if rate is None:
+        return 0
+    limit, period = parse_rate(rate)
+    cost = max(1, min(cost, limit))
+    store = shared_cache() or cache
+    now = time.time()
+    window = int(now // period)
+    elapsed = now - window * period
+    prefixes = [f'ratelimit:{scope}:ip:{client_ip(request)}']
+    user_id = request.session.get(SESSION_KEY)
+    if user_id is not None:
+        prefixes.append(f'ratelimit:{scope}:user:{user_id}')
+
+    keys = [f'{prefix}:{window}' for prefix in prefixes]
+    previous = store.get_many([f'{prefix}:{window - 1}'
+                               for prefix in prefixes])
+    retry_after = 0
+    for prefix, key in zip(prefixes, keys):
+        store.add(key, 0, 2 * period)
+        current = store.incr(key, cost)
+        before = previous.get(f'{prefix}:{window - 1}', 0)
+        if before * (1 - elapsed / period) + current > limit:
+            retry_after = max(retry_after, _retry_after(
+                limit, period, elapsed, before, current - cost, cost))
+    if retry_after:
+        # Отклонённые запросы не занимают место в окне.
+        for key in keys:
+            try:
+                store.decr(key, cost)
+            except ValueError:
+                pass
+    return retry_after
+
+
+def _retry_after(limit, period, elapsed, before, current, cost):
+    # Через сколько секунд доля прошлого окна уменьшится настолько, что
+    # поместится ещё cost действий; если текущее окно уже заполнено —
+    # до начала следующего.
+    room = limit - current - cost
+    if room < 0 or not before:
+        wait = period - elapsed
+    else:
+        wait = period * (1 - room / before) - elapsed
+    return max(1, math.ceil(wait))
@@ -0,0 +1,78 @@
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .models import Follow, FollowRecommendation, Post
+
+User = get_user_model()
+
+
+def iter_user_batches(batch_size):
+    last_pk = 0
+    while True:
+        batch = list(User.objects.filter(pk__gt=last_pk)
+                     .order_by('pk')
+                     .values_list('pk', flat=True)[:batch_size])
+        if not batch:
+            return
+        yield batch
+        last_pk = batch[-1]
+
+
+def build_recommendations(user_ids, limit=None):
+    """Пересчитывает рекомендации для пачки пользователей: авторы, на
+    которых подписаны ваши подписки, ранжируются по числу таких подписок,
+    а при равенстве — по числу недавних постов.
+    """
+    limit = limit or settings.RECOMMENDATIONS_LIMIT
+    following = defaultdict(set)
+    for user_id, author_id in Follow.objects.filter(
+            user_id__in=user_ids).values_list('user_id', 'author_id'):
+        following[user_id].add(author_id)
+
+    # Подписки подписок считаются в базе: списки подписок и кандидатов
+    # у больших аккаунтов не передаются в запрос параметрами.
+    second_hop = Follow.objects.filter(user__following__user_id__in=user_ids)
+    candidates = defaultdict(Counter)
+    for user_id, author_id, common in (
+            second_hop.order_by()
+            .values_list('user__following__user_id', 'author_id')
+            .annotate(common=Count('id'))):
+        if author_id != user_id and author_id not in following[user_id]:
+            candidates[user_id][author_id] = common
+
+    since = timezone.now() - timedelta(
+        days=settings.RECOMMENDATIONS_ACTIVITY_DAYS)
+    activity = dict(
+        Post.objects.filter(author_id__in=second_hop.values('author_id'),
+                            pub_date__gte=since)
+        .order_by()
+        .values('author_id')
+        .annotate(posts=Count('id'))
+        .values_list('author_id', 'posts')
+    )
+
+    recommendations = []
+    for user_id, overlap in candidates.items():
+        scored = []
+        for author_id, common in overlap.items():
+            recent = activity.get(author_id, 0)
+            # Недавняя активность только упорядочивает авторов с
+            # одинаковым числом общих подписок.
+            scored.append((common + recent / (recent + 1), common, author_id))
+        scored.sort(reverse=True)
+        recommendations.extend(
+            FollowRecommendation(user_id=user_id, author_id=author_id,
+                                 score=score, common_follows=common)
+            for score, common, author_id in scored[:limit]
+        )
+
+    with transaction.atomic():
+        FollowRecommendation.objects.filter(user_id__in=user_ids).delete()
+        FollowRecommendation.objects.bulk_create(recommendations)
+    return len(recommendations)
@@ -0,0 +1,68 @@
+import hashlib
+import re
+from functools import wraps
+from urllib.parse import parse_qsl, urlencode
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+HOLE_RE = re.compile(r'<!--hole:(\w+)\?([^>]*)-->')
+
+
+def hole_marker(name, params):
+    return mark_safe(f'<!--hole:{name}?{urlencode(params)}-->')
+
+
+def render_hole(name, params, user):
+    template = get_template(f'includes/holes/{name}.html')
+    return template.render({'user': user, **params})
+
+
+def fill_holes(shell, request):
+    return HOLE_RE.sub(
+        lambda match: render_hole(match.group(1),
+                                  dict(parse_qsl(match.group(2))),
+                                  request.user),
+        shell,
+    )
+
+
+def cache_shell(timeout):
+    """Кэширует страницу без пользовательских фрагментов одной копией
+    для всех посетителей.
+
+    При рендере шаблонов с request.page_shell тег {% hole %} оставляет
+    вместо фрагмента метку, а при каждом запросе метки заменяются
+    фрагментами для текущего пользователя без обращения к базе.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view_func(request, *args, **kwargs)
+            path = request.get_full_path().encode()
+            key = f'page_shell:{hashlib.md5(path).hexdigest()}'
+            cached = cache.get(key)
+            if cached is not None:
+                shell, headers = cached
+                response = HttpResponse(fill_holes(shell, request))
+                for header, value in headers:
+                    response[header] = value
+                return response
+            request.page_shell = True
+            response = view_func(request, *args, **kwargs)
+            if response.streaming:
+                return response
+            shell = response.content.decode(response.charset)
+            if response.status_code == 200:
+                # Заголовки view (Content-Type, Vary и т. п.) кэшируются
+                # вместе с оболочкой; куки в них не входят.
+                cache.set(key, (shell, list(response.items())), timeout)
+            # Тело подставляется в исходный ответ, чтобы сохранить его
+            # статус, заголовки и куки.
+            response.content = fill_holes(shell, request)
+            return response
+        return wrapper
+    return decorator
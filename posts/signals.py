@@ -0,0 +1,41 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import date_archive, stats, tags
+from .archive import is_archiving
+from .models import Post
+from .paginator import mark_changed
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, update_fields=None, **kwargs):
+    old_group_id = getattr(instance, '_loaded_group_id', None)
+    if created or old_group_id != instance.group_id:
+        mark_changed()
+    if created:
+        date_archive.count_post(instance, 1)
+        if instance.group_id:
+            stats.group_post_added(instance.group_id, instance)
+    elif old_group_id != instance.group_id:
+        if old_group_id:
+            date_archive.count_post(instance, -1, [f'group:{old_group_id}'])
+            stats.group_post_removed(old_group_id, instance)
+        if instance.group_id:
+            date_archive.count_post(instance, 1,
+                                    [f'group:{instance.group_id}'])
+            stats.group_post_added(instance.group_id, instance)
+    elif instance.group_id:
+        stats.group_post_edited(instance.group_id, instance)
+    instance._loaded_group_id = instance.group_id
+    if created or update_fields is None or 'text' in update_fields:
+        tags.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    if is_archiving():
+        return
+    mark_changed()
+    date_archive.count_post(instance, -1)
+    if instance.group_id:
+        stats.group_post_removed(instance.group_id, instance)
@@ -0,0 +1,64 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+from django.utils.text import Truncator
+
+from .models import GroupStats, Post
+
+EXCERPT_LENGTH = 150
+
+
+def _last_post_fields(post):
+    return {
+        'last_post': post,
+        'last_post_date': post.pub_date,
+        'last_post_excerpt': Truncator(post.text).chars(EXCERPT_LENGTH),
+    }
+
+
+def group_post_added(group_id, post):
+    stats = GroupStats.objects.filter(group_id=group_id)
+    if not stats.update(posts_count=F('posts_count') + 1):
+        try:
+            with transaction.atomic():
+                GroupStats.objects.create(group_id=group_id, posts_count=1,
+                                          **_last_post_fields(post))
+            return
+        except IntegrityError:
+            stats.update(posts_count=F('posts_count') + 1)
+    stats.filter(
+        Q(last_post_date__isnull=True) | Q(last_post_date__lte=post.pub_date)
+    ).update(**_last_post_fields(post))
+
+
+def group_post_removed(group_id, post):
+    stats = GroupStats.objects.filter(group_id=group_id)
+    stats.filter(posts_count__gt=0).update(posts_count=F('posts_count') - 1)
+    # Последнюю запись нужно найти заново, если убрали именно её: при
+    # удалении ссылка на неё к этому моменту уже обнулена через SET_NULL.
+    if stats.filter(Q(last_post__isnull=True) | Q(last_post=post.pk)).exists():
+        refresh_last_post(group_id, exclude_pk=post.pk)
+
+
+def group_posts_removed(group_id, count):
+    """Уменьшает счётчик группы на count удалённых архивных записей.
+    Последняя запись группы не меняется: архивные посты старше свежих.
+    """
+    GroupStats.objects.filter(group_id=group_id).update(
+        posts_count=Greatest(F('posts_count') - count, 0))
+
+
+def group_post_edited(group_id, post):
+    GroupStats.objects.filter(group_id=group_id, last_post=post).update(
+        last_post_excerpt=Truncator(post.text).chars(EXCERPT_LENGTH))
+
+
+def refresh_last_post(group_id, exclude_pk=None):
+    latest = (Post.objects.filter(group_id=group_id)
+              .exclude(pk=exclude_pk).order_by('-pub_date').first())
+    if latest is None:
+        fields = {'last_post': None, 'last_post_date': None,
+                  'last_post_excerpt': ''}
+    else:
+        fields = _last_post_fields(latest)
+    GroupStats.objects.filter(group_id=group_id).update(**fields)
@@ -0,0 +1,54 @@
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.middleware.csrf import get_token
+from django.shortcuts import render
+from django.template import loader
+from django.utils.safestring import mark_safe
+
+# Метка на месте списка, который отдаётся по одному элементу. Текст
+# постов и комментариев экранируется, поэтому в нём метка встретиться
+# не может.
+STREAM_MARKER = '<!--stream-->'
+
+
+def stream_render(request, template_name, context=None, status=None,
+                  items=None):
+    """Отдаёт страницу потоком, если включён STREAMING_RENDER.
+
+    Первым куском уходит начало head из includes/head.html со ссылками
+    на CSS и скрипты, затем страница до списка items (шапка и навигация),
+    затем элементы списка, каждый отдельным куском по мере чтения из базы,
+    и остаток страницы. Так клиент начинает загружать статику и получать
+    страницу до конца рендера, а в памяти не собирается вся страница.
+
+    items — тройка (имя переменной, шаблон элемента, объекты). Шаблон
+    страницы выводит {{ stream_slot }} вместо своего цикла по ним.
+    Пустой список (длиной 0) выводится циклом шаблона, вместе с его
+    {% empty %}.
+    """
+    if not settings.STREAMING_RENDER:
+        return render(request, template_name, context, status=status)
+    template = loader.get_template(template_name)
+    # Куку CSRF нужно выставить до того, как ответ пройдёт middleware.
+    get_token(request)
+    context = {**(context or {}), 'head_sent': True}
+    if items is not None and hasattr(items[2], '__len__') and not items[2]:
+        items = None
+    return StreamingHttpResponse(
+        _stream(template, context, request, items), status=status)
+
+
+def _stream(template, context, request, items):
+    yield loader.render_to_string('includes/head.html', request=request)
+    if items is None:
+        yield template.render(context, request)
+        return
+    name, item_template_name, objects = items
+    slot = mark_safe(STREAM_MARKER)
+    page = template.render({**context, 'stream_slot': slot}, request)
+    before, after = page.split(STREAM_MARKER, 1)
+    yield before
+    item_template = loader.get_template(item_template_name)
+    for obj in objects:
+        yield item_template.render({**context, name: obj}, request)
+    yield after
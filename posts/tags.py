@@ -0,0 +1,28 @@
+from django.contrib.auth import get_user_model
+
+from .markup import extract_mentions, extract_tags
+from .models import Mention, PostTag, Tag
+
+User = get_user_model()
+
+
+def index_post(post):
+    """Приводит теги и упоминания поста в соответствие с его текстом."""
+    names = extract_tags(post.text)
+    PostTag.objects.filter(post=post).exclude(tag__name__in=names).delete()
+    if names:
+        Tag.objects.bulk_create([Tag(name=name) for name in names],
+                                ignore_conflicts=True)
+        PostTag.objects.bulk_create([
+            PostTag(post=post, tag=tag, pub_date=post.pub_date)
+            for tag in Tag.objects.filter(name__in=names)
+        ], ignore_conflicts=True)
+
+    usernames = extract_mentions(post.text)
+    Mention.objects.filter(post=post).exclude(
+        user__username__in=usernames).delete()
+    if usernames:
+        Mention.objects.bulk_create([
+            Mention(post=post, user=user, pub_date=post.pub_date)
+            for user in User.objects.filter(username__in=usernames)
+        ], ignore_conflicts=True)
@@ -0,0 +1,69 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from sorl.thumbnail import get_thumbnail
+
+from jobs.queue import task
+from monitoring.metrics import timer
+
+from .models import Notification, Post, Purge
+from .notifications import notify
+from .purge import purge_batch
+from .recommendations import build_recommendations
+from .trending import record_comment
+
+User = get_user_model()
+
+
+@task(concurrency=1)
+def update_trending(post_id, created):
+    record_comment(post_id, parse_datetime(created))
+
+
+@task(concurrency=2)
+def make_thumbnail(post_id):
+    post = Post.objects.filter(pk=post_id).first()
+    if post is not None and post.image:
+        # Та же геометрия, что и в includes/post_item.html.
+        with timer('yatube_thumbnail_seconds'):
+            get_thumbnail(post.image, '960x500', crop='center',
+                          upscale=True)
+
+
+@task()
+def refresh_recommendations(user_id):
+    build_recommendations([user_id])
+
+
+@task(concurrency=1)
+def purge(purge_id):
+    mark = Purge.objects.select_related('user', 'group').filter(
+        pk=purge_id).first()
+    if mark is not None and purge_batch(mark, settings.PURGE_BATCH_SIZE):
+        # Следующая порция ждёт PURGE_PAUSE секунд, чтобы не держать
+        # блокировку базы подряд.
+        purge.enqueue(
+            run_after=timezone.now() + timedelta(seconds=settings.PURGE_PAUSE),
+            purge_id=purge_id,
+        )
+
+
+@task()
+def notify_comment(post_id, actor_id):
+    author_id = Post.objects.filter(pk=post_id).values_list(
+        'author_id', flat=True).first()
+    if author_id is not None:
+        notify([author_id], actor_id, Notification.COMMENT, post_id)
+
+
+@task()
+def notify_follow(actor_id, username=None, usernames=()):
+    # username — подписка со страницы автора, usernames — пакетная.
+    usernames = [username] if username else list(usernames)
+    recipients = User.objects.filter(
+        username__in=usernames, purge__isnull=True
+    ).values_list('pk', flat=True)
+    notify(recipients, actor_id, Notification.FOLLOW)
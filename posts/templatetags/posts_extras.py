@@ -0,0 +1,72 @@
+from django import template
+
+from posts.date_archive import archive_months
+from posts.models import FollowRecommendation
+from posts.notifications import unread_count
+from posts.shell_cache import hole_marker, render_hole
+from posts.trending import trending_posts as get_trending_posts
+
+register = template.Library()
+
+
+@register.simple_tag
+def page_window(page, around=2):
+    """Номера страниц для паджинатора: первая, последняя и around страниц
+    вокруг текущей. Пропущенные диапазоны обозначаются None.
+    """
+    last = page.paginator.num_pages
+    numbers = {1, last}
+    numbers.update(range(max(1, page.number - around),
+                         min(last, page.number + around) + 1))
+    window = []
+    previous = 0
+    for number in sorted(numbers):
+        if number - previous == 2:
+            window.append(number - 1)
+        elif number - previous > 2:
+            window.append(None)
+        window.append(number)
+        previous = number
+    return window
+
+
+@register.inclusion_tag('includes/recommendations.html')
+def follow_recommendations(user):
+    """Панель «На кого подписаться» из заранее посчитанного списка."""
+    recommendations = []
+    if user.is_authenticated:
+        recommendations = (FollowRecommendation.objects
+                           .filter(user=user, author__purge__isnull=True)
+                           .select_related('author'))
+    return {'recommendations': recommendations}
+
+
+@register.inclusion_tag('includes/trending.html')
+def trending_posts(limit=5):
+    """Самые обсуждаемые сейчас посты."""
+    return {'posts': get_trending_posts(limit)}
+
+
+@register.inclusion_tag('includes/archive_nav.html')
+def archive_nav(group=None, author=None):
+    """Навигация по месяцам из таблицы помесячных счётчиков."""
+    return {'months': archive_months(group, author)}
+
+
+@register.simple_tag
+def unread_notifications(user):
+    """Число непрочитанных уведомлений из кэшированного счётчика."""
+    return unread_count(user) if user.is_authenticated else 0
+
+
+@register.simple_tag(takes_context=True)
+def hole(context, name, **params):
+    """Фрагмент, зависящий от пользователя, из
+    includes/holes/<name>.html. В кэшируемой оболочке страницы
+    (см. posts.shell_cache) вместо него выводится метка.
+    """
+    params = {key: str(value) for key, value in params.items() if value}
+    request = context.get('request')
+    if getattr(request, 'page_shell', False):
+        return hole_marker(name, params)
+    return render_hole(name, params, context.get('user'))
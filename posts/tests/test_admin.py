@@ -0,0 +1,59 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class AdminTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password')
+        self.client = Client()
+        self.client.force_login(admin)
+        self.group = Group.objects.create(title='Группа', slug='group',
+                                          description='Описание')
+
+    def add_posts(self, count, prefix='author'):
+        for i in range(count):
+            author = User.objects.create(username=f'{prefix}{i}')
+            post = Post.objects.create(text=f'Пост {i}', author=author,
+                                       group=self.group)
+            Comment.objects.create(post=post, author=author,
+                                   text=f'Комментарий {i}')
+
+    def count_queries(self, url):
+        cache.clear()
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        return len(queries)
+
+    def test_changelist_queries_do_not_depend_on_rows(self):
+        """Число запросов списка постов и комментариев не растёт
+        с числом строк
+        """
+        urls = [reverse('admin:posts_post_changelist'),
+                reverse('admin:posts_comment_changelist')]
+        self.add_posts(1)
+        few = [self.count_queries(url) for url in urls]
+        self.add_posts(5, prefix='extra')
+        many = [self.count_queries(url) for url in urls]
+        self.assertEqual(many, few)
+
+    def test_author_input_filter(self):
+        """Фильтр по автору принимает username из поля ввода"""
+        self.add_posts(3)
+        response = self.client.get(reverse('admin:posts_post_changelist'),
+                                   {'author': 'author1'})
+        self.assertEqual(response.context['cl'].result_count, 1)
+        self.assertContains(response, 'name="author"')
+        response = self.client.get(reverse('admin:posts_post_changelist'),
+                                   {'q': '@author2'})
+        self.assertEqual(response.context['cl'].result_count, 1)
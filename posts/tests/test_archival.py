@@ -0,0 +1,125 @@
+from datetime import datetime
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import (ArchivedComment, ArchivedPost, Comment, Group,
+                          GroupStats, MonthlyPostCount, Post)
+from posts.paginator import CHANGED_KEY, ChainedFeed
+
+User = get_user_model()
+
+
+class ArchivalTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create(username='author')
+        self.group = Group.objects.create(title='Группа', slug='group',
+                                          description='Описание')
+        old = timezone.make_aware(datetime(2020, 5, 1))
+        with mock.patch('django.utils.timezone.now', return_value=old):
+            self.old_posts = [
+                Post.objects.create(text=f'Старый пост {i}',
+                                    author=self.author, group=self.group)
+                for i in range(2)
+            ]
+            Comment.objects.create(post=self.old_posts[0],
+                                   author=self.author,
+                                   text='Старый комментарий')
+        self.new_post = Post.objects.create(text='Свежий пост',
+                                            author=self.author,
+                                            group=self.group)
+
+    def archive(self):
+        call_command('archive_posts', '--batch-size', '1', '--pause', '0',
+                     stdout=StringIO())
+
+    def test_command_moves_old_posts(self):
+        """Старые посты и комментарии переезжают в архив, счётчики
+        не меняются, повторный запуск ничего не делает
+        """
+        counts = list(MonthlyPostCount.objects.values_list(
+            'scope', 'year', 'month', 'posts_count'))
+        self.archive()
+        self.assertEqual(list(Post.objects.all()), [self.new_post])
+        self.assertEqual(ArchivedPost.objects.count(), 2)
+        self.assertEqual(
+            ArchivedComment.objects.get().post_id, self.old_posts[0].pk)
+        self.assertEqual(GroupStats.objects.get(group=self.group).posts_count,
+                         3)
+        self.assertEqual(list(MonthlyPostCount.objects.values_list(
+            'scope', 'year', 'month', 'posts_count')), counts)
+        self.archive()
+        self.assertEqual(ArchivedPost.objects.count(), 2)
+
+    def test_chained_feed_reads_archive(self):
+        """Лента продолжается архивом после свежих постов"""
+        self.archive()
+        feed = ChainedFeed(Post.objects.all(), ArchivedPost.objects.all(),
+                           'test')
+        self.assertEqual(feed.count(), 3)
+        self.assertEqual([post.pk for post in feed[0:2]],
+                         [self.new_post.pk, self.old_posts[1].pk])
+        self.assertEqual([post.pk for post in feed[2:3]],
+                         [self.old_posts[0].pk])
+        response = Client().get(reverse('group', args=[self.group.slug]))
+        self.assertEqual(len(response.context.get('page')), 3)
+
+    @override_settings(PAGINATOR_COUNT_THRESHOLD=1)
+    def test_chained_feed_pages_with_stale_counts(self):
+        """Лента листается целиком, без пропусков и повторов, и когда
+        новые посты отмечены mark_changed, и когда кэш другого процесса
+        о них не знает
+        """
+        Post.objects.all().delete()
+        old = timezone.make_aware(datetime(2020, 5, 1))
+        with mock.patch('django.utils.timezone.now', return_value=old):
+            for i in range(10):
+                Post.objects.create(text=f'Архив {i}', author=self.author)
+        self.archive()
+        for i in range(5):
+            Post.objects.create(text=f'Пост {i}', author=self.author)
+
+        for stale_in_other_process in (False, True):
+            with self.subTest(stale_in_other_process=stale_in_other_process):
+                cache.clear()
+                feed = ChainedFeed(Post.objects.all(),
+                                   ArchivedPost.objects.all(), 'test')
+                feed.count()
+                for i in range(3):
+                    Post.objects.create(text=f'Новый пост {i}',
+                                        author=self.author)
+                if stale_in_other_process:
+                    cache.delete(CHANGED_KEY)
+                feed = ChainedFeed(Post.objects.all(),
+                                   ArchivedPost.objects.all(), 'test')
+                total = Post.objects.count() + ArchivedPost.objects.count()
+                if not stale_in_other_process:
+                    self.assertEqual(feed.count(), total)
+                seen = []
+                for start in range(0, total, 4):
+                    seen += [post.pk for post in feed[start:start + 4]]
+                expected = (
+                    list(Post.objects.values_list('pk', flat=True))
+                    + list(ArchivedPost.objects.values_list('pk', flat=True)))
+                self.assertEqual(seen, expected)
+
+    def test_archived_permalink(self):
+        """Старая ссылка на пост открывает его из архива без кнопок"""
+        self.archive()
+        client = Client()
+        client.force_login(self.author)
+        post = self.old_posts[0]
+        response = client.get(
+            reverse('post', args=[self.author.username, post.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Старый комментарий')
+        self.assertNotContains(
+            response, reverse('post_edit',
+                              args=[self.author.username, post.pk]))
@@ -0,0 +1,66 @@
+from datetime import datetime
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Group, MonthlyPostCount, Post
+
+User = get_user_model()
+
+
+class DateArchiveTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author')
+        cls.group = Group.objects.create(title='Группа', slug='group',
+                                         description='Описание')
+        march = timezone.make_aware(datetime(2025, 3, 15))
+        with mock.patch('django.utils.timezone.now', return_value=march):
+            cls.old_post = Post.objects.create(text='Мартовский пост',
+                                               author=cls.author,
+                                               group=cls.group)
+        cls.new_post = Post.objects.create(text='Свежий пост',
+                                           author=cls.author)
+        cls.now = timezone.localtime(cls.new_post.pub_date)
+
+    def counts(self, scope):
+        return dict(
+            ((counter.year, counter.month), counter.posts_count)
+            for counter in MonthlyPostCount.objects.filter(scope=scope)
+        )
+
+    def test_monthly_counts_are_maintained(self):
+        """Помесячные счётчики обновляются при создании и удалении постов"""
+        current = (DateArchiveTest.now.year, DateArchiveTest.now.month)
+        self.assertEqual(self.counts('all'), {(2025, 3): 1, current: 1})
+        self.assertEqual(self.counts(f'group:{DateArchiveTest.group.pk}'),
+                         {(2025, 3): 1})
+        DateArchiveTest.new_post.delete()
+        self.assertEqual(self.counts('all'), {(2025, 3): 1, current: 0})
+
+    def test_month_archive_pages(self):
+        """Архив месяца показывает только посты за этот месяц"""
+        client = Client()
+        urls = [
+            reverse('archive_month', args=[2025, 3]),
+            reverse('group_archive_month',
+                    args=[DateArchiveTest.group.slug, 2025, 3]),
+            reverse('profile_archive_month',
+                    args=[DateArchiveTest.author.username, 2025, 3]),
+            reverse('archive', args=[2025]),
+        ]
+        for url in urls:
+            with self.subTest(params=url):
+                response = client.get(url)
+                self.assertEqual(list(response.context.get('page')),
+                                 [DateArchiveTest.old_post])
+                self.assertContains(response, '3.2025')
+
+    def test_invalid_month_returns_404(self):
+        """Несуществующий месяц возвращает 404"""
+        response = Client().get(reverse('archive_month', args=[2025, 13]))
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,72 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, FollowRecommendation, Post
+
+User = get_user_model()
+
+
+class BenchTemplatesCommandTest(TestCase):
+    def test_bench_templates_reports_every_template(self):
+        """bench_templates выводит время рендера каждого шаблона"""
+        out = StringIO()
+        call_command('bench_templates', sizes=[10], repeat=1, stdout=out)
+        output = out.getvalue()
+        for template in ('index.html', 'profile.html', 'post.html'):
+            with self.subTest(params=template):
+                self.assertIn(template, output)
+
+
+class BuildRecommendationsCommandTest(TestCase):
+    def test_recommends_authors_followed_by_followees(self):
+        """Рекомендуются авторы, на которых подписаны ваши подписки,
+        в порядке числа общих подписок и активности
+        """
+        user, friend1, friend2, popular, active, quiet = [
+            User.objects.create(username=name)
+            for name in ('user', 'friend1', 'friend2', 'popular',
+                         'active', 'quiet')
+        ]
+        Follow.objects.create(user=user, author=friend1)
+        Follow.objects.create(user=user, author=friend2)
+        for friend in (friend1, friend2):
+            Follow.objects.create(user=friend, author=popular)
+        Follow.objects.create(user=friend1, author=quiet)
+        Follow.objects.create(user=friend2, author=active)
+        Follow.objects.create(user=friend1, author=user)
+        Post.objects.create(text='Свежий пост', author=active)
+
+        call_command('build_recommendations', batch_size=2,
+                     stdout=StringIO())
+
+        recommended = list(
+            FollowRecommendation.objects.filter(user=user)
+            .values_list('author__username', 'common_follows'))
+        self.assertEqual(recommended,
+                         [('popular', 2), ('active', 1), ('quiet', 1)])
+
+        client = Client()
+        client.force_login(user)
+        response = client.get(reverse('follow_index'))
+        self.assertContains(response, '@popular')
+
+
+class RenderMarkupCommandTest(TestCase):
+    def test_render_markup_restores_html(self):
+        """render_markup заполняет HTML постов и комментариев"""
+        author = User.objects.create(username='author')
+        post = Post.objects.create(text='<b>жирный</b>\nстрока',
+                                   author=author)
+        Comment.objects.create(post=post, author=author, text='a\nb')
+        Post.objects.update(text_html='', excerpt_html='')
+        Comment.objects.update(text_html='')
+        call_command('render_markup', stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual(post.text_html,
+                         '&lt;b&gt;жирный&lt;/b&gt;<br>строка')
+        self.assertEqual(post.excerpt_html, post.text_html)
+        self.assertEqual(Comment.objects.get().text_html, 'a<br>b')
@@ -0,0 +1,69 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Group, GroupStats, Post
+
+User = get_user_model()
+
+
+class GroupStatsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author')
+        cls.group = Group.objects.create(title='Первая', slug='first',
+                                         description='Описание')
+        cls.other_group = Group.objects.create(title='Вторая',
+                                               slug='second',
+                                               description='Описание')
+
+    def stats(self, group):
+        return GroupStats.objects.get(group=group)
+
+    def test_stats_follow_new_posts(self):
+        """Новые посты увеличивают счётчик и меняют последнюю запись"""
+        Post.objects.create(text='Старый пост', author=GroupStatsTest.author,
+                            group=GroupStatsTest.group)
+        post = Post.objects.create(text='Новый пост',
+                                   author=GroupStatsTest.author,
+                                   group=GroupStatsTest.group)
+        stats = self.stats(GroupStatsTest.group)
+        self.assertEqual(stats.posts_count, 2)
+        self.assertEqual(stats.last_post, post)
+        self.assertEqual(stats.last_post_excerpt, 'Новый пост')
+
+    def test_stats_follow_moved_and_deleted_posts(self):
+        """Перенос поста в другую группу и удаление пересчитывают
+        статистику обеих групп
+        """
+        old = Post.objects.create(text='Старый пост',
+                                  author=GroupStatsTest.author,
+                                  group=GroupStatsTest.group)
+        post = Post.objects.create(text='Новый пост',
+                                   author=GroupStatsTest.author,
+                                   group=GroupStatsTest.group)
+        post = Post.objects.get(pk=post.pk)
+        post.group = GroupStatsTest.other_group
+        post.save()
+        stats = self.stats(GroupStatsTest.group)
+        self.assertEqual(stats.posts_count, 1)
+        self.assertEqual(stats.last_post, old)
+        self.assertEqual(self.stats(GroupStatsTest.other_group).posts_count,
+                         1)
+
+        old.delete()
+        stats = self.stats(GroupStatsTest.group)
+        self.assertEqual(stats.posts_count, 0)
+        self.assertIsNone(stats.last_post)
+        self.assertEqual(stats.last_post_excerpt, '')
+
+    def test_groups_page(self):
+        """Каталог сообществ показывает число записей и последнюю запись"""
+        Post.objects.create(text='Запись в группе',
+                            author=GroupStatsTest.author,
+                            group=GroupStatsTest.group)
+        response = Client().get(reverse('groups'))
+        self.assertEqual(len(response.context.get('page')), 2)
+        self.assertContains(response, 'Записей: 1')
+        self.assertContains(response, 'Запись в группе')
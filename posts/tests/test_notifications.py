@@ -0,0 +1,94 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from jobs.queue import run_pending
+from posts.models import Follow, Notification, Post
+from users.tests import SHARED_CACHES
+
+User = get_user_model()
+
+
+@override_settings(CACHES=SHARED_CACHES)
+class NotificationsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        caches['shared'].clear()
+        self.author = User.objects.create(username='author')
+        self.reader = User.objects.create(username='reader')
+        self.post = Post.objects.create(text='Пост', author=self.author)
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def unread_badge(self):
+        response = self.author_client.get(reverse('groups'))
+        return response.context['unread']
+
+    def test_comment_and_follow_notify_author(self):
+        """Комментарий и подписка создают уведомления в фоновой задаче,
+        счётчик непрочитанных берётся из кэша и сбрасывается при чтении
+        """
+        self.assertEqual(self.unread_badge(), 0)
+        self.reader_client.post(
+            reverse('add_comment', args=['author', self.post.id]),
+            {'text': 'Комментарий'})
+        self.reader_client.get(reverse('profile_follow', args=['author']))
+        self.author_client.post(
+            reverse('add_comment', args=['author', self.post.id]),
+            {'text': 'Свой комментарий'})
+        self.assertFalse(Notification.objects.exists())
+
+        run_pending()
+        self.assertEqual(
+            set(Notification.objects.values_list('kind', flat=True)),
+            {Notification.COMMENT, Notification.FOLLOW})
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.unread_badge(), 2)
+        self.assertFalse([query for query in queries.captured_queries
+                          if 'posts_notification' in query['sql']])
+
+        response = self.author_client.get(reverse('notifications'))
+        self.assertEqual(len(response.context['page']), 2)
+        self.assertContains(
+            response, reverse('post', args=['author', self.post.id]))
+        self.assertEqual(self.unread_badge(), 0)
+        self.assertFalse(Notification.objects.filter(read=False).exists())
+
+    def test_batch_follow_notifies_new_authors(self):
+        """Пакетная подписка уведомляет только авторов, на которых
+        пользователь ещё не был подписан
+        """
+        other = User.objects.create(username='other')
+        Follow.objects.create(user=self.reader, author=other)
+        self.reader_client.post(reverse('follow_batch'), {
+            'action': 'follow',
+            'username': ['author', 'author', 'other', 'reader', 'nobody'],
+        })
+        run_pending()
+        self.assertEqual(
+            list(Notification.objects.values_list('recipient__username',
+                                                  'kind')),
+            [('author', Notification.FOLLOW)])
+
+    def test_notifications_require_login(self):
+        """Страница уведомлений доступна только авторизованным"""
+        response = Client().get(reverse('notifications'))
+        self.assertRedirects(
+            response,
+            f'{reverse("login")}?next={reverse("notifications")}')
+
+    @override_settings(CACHES={'default': SHARED_CACHES['default']},
+                       NOTIFICATIONS_COUNT_TTL=0)
+    def test_count_is_recounted_without_shared_cache(self):
+        """Без общего кэша фоновая задача не трогает счётчики процесса,
+        а веб-процесс пересчитывает их после NOTIFICATIONS_COUNT_TTL
+        """
+        self.assertEqual(self.unread_badge(), 0)
+        self.reader_client.get(reverse('profile_follow', args=['author']))
+        run_pending()
+        self.assertEqual(self.unread_badge(), 1)
@@ -3,10 +3,13 @@ from datetime import datetime as dt
 
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
-from django.test import Client, TestCase
+from django.core.paginator import Paginator
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
 from posts.models import Group, Post
+from posts.paginator import CachedCountQuerySet, refresh_count
+from posts.templatetags.posts_extras import page_window
 
 User = get_user_model()
 
@@ -82,3 +85,59 @@ class PaginatorViewsTest(TestCase):
                                  PaginatorViewsTest.author.username)
                 self.assertEqual(posts_pub_date,
                                  PaginatorViewsTest.post.pub_date.date())
+
+
+class PageWindowTest(TestCase):
+    def test_page_window_is_bounded(self):
+        """Паджинатор показывает первую, последнюю и соседние страницы
+        независимо от длины ленты
+        """
+        paginator = Paginator(range(50000), 10)
+        cases = {
+            1: [1, 2, 3, None, 5000],
+            4: [1, 2, 3, 4, 5, 6, None, 5000],
+            2500: [1, None, 2498, 2499, 2500, 2501, 2502, None, 5000],
+            5000: [1, None, 4998, 4999, 5000],
+        }
+        for number, expected in cases.items():
+            with self.subTest(params=number):
+                window = page_window(paginator.page(number))
+                self.assertEqual(window, expected)
+
+    def test_page_window_single_page(self):
+        """Для одной страницы окно состоит из неё самой"""
+        self.assertEqual(page_window(Paginator(range(5), 10).page(1)), [1])
+
+
+class CachedCountTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='Counter')
+        for i in range(3):
+            Post.objects.create(text=f'Text{i}', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(PAGINATOR_COUNT_THRESHOLD=1000)
+    def test_small_feed_is_counted_exactly(self):
+        """Для небольших лент число постов считается точно"""
+        queryset = CachedCountQuerySet(Post.objects.all(), 'test')
+        self.assertEqual(queryset.count(), 3)
+        Post.objects.create(text='Text', author=CachedCountTest.author)
+        self.assertEqual(queryset.count(), 4)
+
+    @override_settings(PAGINATOR_COUNT_THRESHOLD=3,
+                       PAGINATOR_COUNT_TTL=60)
+    def test_large_feed_count_is_cached(self):
+        """Для больших лент число постов берётся из кэша,
+        пока не будет пересчитано
+        """
+        queryset = CachedCountQuerySet(Post.objects.all(), 'test')
+        self.assertEqual(queryset.count(), 3)
+        Post.objects.create(text='Text', author=CachedCountTest.author)
+        with self.assertNumQueries(0):
+            self.assertEqual(queryset.count(), 3)
+        refresh_count(Post.objects.all(), queryset.key)
+        self.assertEqual(queryset.count(), 4)
@@ -0,0 +1,148 @@
+from datetime import datetime
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from jobs.queue import run_pending
+from posts.models import (ArchivedPost, Comment, Follow, FollowRecommendation,
+                          Group, GroupStats, Mention, MonthlyPostCount,
+                          Notification, Post, PostTag, Purge)
+from posts.templatetags.posts_extras import follow_recommendations
+from posts.trending import record_comment, trending_posts
+
+User = get_user_model()
+
+
+@override_settings(PURGE_BATCH_SIZE=2, PURGE_PAUSE=0)
+class PurgeTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password')
+        self.admin_client = Client()
+        self.admin_client.force_login(self.admin)
+        self.author = User.objects.create(username='author')
+        self.reader = User.objects.create(username='reader')
+        self.group = Group.objects.create(title='Группа', slug='group',
+                                          description='Описание')
+        for i in range(5):
+            post = Post.objects.create(text=f'Пост {i} #тег @reader',
+                                       author=self.author,
+                                       group=self.group)
+            Comment.objects.create(post=post, author=self.reader,
+                                   text=f'Комментарий {i}')
+        Follow.objects.create(user=self.reader, author=self.author)
+        Notification.objects.create(recipient=self.author, actor=self.reader,
+                                    kind=Notification.FOLLOW)
+
+    def purge(self, changelist, pk):
+        return self.admin_client.post(reverse(changelist), {
+            'action': 'purge_selected',
+            '_selected_action': [pk],
+        })
+
+    def test_user_is_hidden_then_purged(self):
+        """Отмеченный пользователь сразу скрыт, а его записи удаляются
+        фоновой задачей порциями
+        """
+        self.purge('admin:auth_user_changelist', self.author.pk)
+        self.author.refresh_from_db()
+        self.assertFalse(self.author.is_active)
+        client = Client()
+        response = client.get(reverse('profile', args=['author']))
+        self.assertEqual(response.status_code, 404)
+        response = client.get(reverse('index'))
+        self.assertEqual(len(response.context.get('page')), 0)
+        self.assertEqual(Post.objects.count(), 5)
+
+        self.assertGreater(run_pending(), 1)
+        self.assertFalse(User.objects.filter(username='author').exists())
+        self.assertFalse(Post.objects.exists())
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(Follow.objects.exists())
+        self.assertFalse(PostTag.objects.exists())
+        self.assertFalse(Mention.objects.exists())
+        self.assertFalse(Notification.objects.exists())
+        self.assertFalse(Purge.objects.exists())
+        self.assertEqual(
+            GroupStats.objects.get(group=self.group).posts_count, 0)
+
+    def test_group_is_hidden_then_purged(self):
+        """Отмеченная группа сразу скрыта и удаляется вместе с постами"""
+        self.purge('admin:posts_group_changelist', self.group.pk)
+        response = Client().get(reverse('group', args=['group']))
+        self.assertEqual(response.status_code, 404)
+
+        run_pending()
+        self.assertFalse(Group.objects.exists())
+        self.assertFalse(Post.objects.exists())
+        self.assertTrue(User.objects.filter(username='author').exists())
+
+    def test_archived_posts_are_uncounted(self):
+        """Удаление архивных постов уменьшает помесячные счётчики
+        и счётчик группы
+        """
+        old = timezone.make_aware(datetime(2020, 5, 1))
+        with mock.patch('django.utils.timezone.now', return_value=old):
+            Post.objects.create(text='Старый пост', author=self.author,
+                                group=self.group)
+        call_command('archive_posts', '--pause', '0', stdout=StringIO())
+        self.assertEqual(ArchivedPost.objects.count(), 1)
+
+        self.purge('admin:auth_user_changelist', self.author.pk)
+        run_pending()
+        self.assertFalse(ArchivedPost.objects.exists())
+        self.assertFalse(MonthlyPostCount.objects.filter(
+            year=2020, posts_count__gt=0).exists())
+        self.assertEqual(
+            GroupStats.objects.get(group=self.group).posts_count, 0)
+
+    def test_purged_posts_are_hidden_everywhere(self):
+        """Посты отмеченного автора пропадают из популярного, их нельзя
+        комментировать и редактировать
+        """
+        post = Post.objects.first()
+        record_comment(post.pk)
+        self.assertIn(post, trending_posts())
+        self.purge('admin:auth_user_changelist', self.author.pk)
+        self.assertEqual(trending_posts(), [])
+
+        client = Client()
+        client.force_login(self.reader)
+        response = client.post(
+            reverse('add_comment', args=['author', post.pk]),
+            {'text': 'Комментарий'})
+        self.assertEqual(response.status_code, 404)
+        response = client.get(reverse('post_edit', args=['author', post.pk]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_purged_user_is_hidden_from_others(self):
+        """Комментарии, уведомления и рекомендации отмеченного
+        пользователя скрыты сразу, подписаться на него нельзя
+        """
+        FollowRecommendation.objects.create(user=self.author,
+                                            author=self.reader, score=1,
+                                            common_follows=1)
+        self.purge('admin:auth_user_changelist', self.reader.pk)
+        client = Client()
+        client.force_login(self.author)
+        post = Post.objects.first()
+        response = client.get(reverse('post', args=['author', post.pk]))
+        self.assertEqual(list(response.context['comments']), [])
+        response = client.get(reverse('notifications'))
+        self.assertEqual(len(response.context['page']), 0)
+        self.assertEqual(response.context['unread'], 0)
+        self.assertNotContains(response, reverse('profile',
+                                                 args=['reader']))
+        self.assertFalse(
+            follow_recommendations(self.author)['recommendations'])
+
+        client.post(reverse('follow_batch'), {'action': 'follow',
+                                              'username': ['reader']})
+        self.assertFalse(Follow.objects.filter(user=self.author).exists())
@@ -0,0 +1,100 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Mention, Post, PostTag
+
+User = get_user_model()
+
+
+class TagsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create(username='author')
+        self.reader = User.objects.create(username='reader')
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_tags_and_mentions_are_indexed(self):
+        """Теги и упоминания из текста записываются при сохранении поста
+        и обновляются при его изменении
+        """
+        post = Post.objects.create(
+            text='#Django и #python, спасибо @reader. Почта a@b.ru',
+            author=self.author)
+        self.assertEqual(
+            set(post.post_tags.values_list('tag__name', flat=True)),
+            {'django', 'python'})
+        self.assertEqual(
+            list(post.mentions.values_list('user__username', flat=True)),
+            ['reader'])
+        self.assertIn(f'<a href="{reverse("tag", args=["django"])}">'
+                      f'#Django</a>', post.text_html)
+        self.assertIn(f'<a href="{reverse("profile", args=["reader"])}">'
+                      f'@reader</a>.', post.text_html)
+
+        post.text = 'Только #python'
+        post.save()
+        self.assertEqual(
+            list(post.post_tags.values_list('tag__name', flat=True)),
+            ['python'])
+        self.assertFalse(Mention.objects.exists())
+
+    def test_tag_and_mentions_feeds(self):
+        """Лента тега и лента упоминаний показывают посты по дате
+        публикации, упоминания видны только авторизованному пользователю
+        """
+        first = Post.objects.create(text='#новости @reader',
+                                    author=self.author)
+        second = Post.objects.create(text='Ещё #Новости', author=self.author)
+        Post.objects.create(text='Без тегов', author=self.author)
+        self.assertEqual(PostTag.objects.count(), 2)
+
+        response = self.client.get(reverse('tag', args=['новости']))
+        self.assertEqual(list(response.context['page']), [second, first])
+        response = self.client.get(reverse('tag', args=['нет']))
+        self.assertEqual(response.status_code, 404)
+
+        response = self.client.get(reverse('mentions'))
+        self.assertEqual(list(response.context['page']), [first])
+        response = Client().get(reverse('mentions'))
+        self.assertRedirects(
+            response, f'{reverse("login")}?next={reverse("mentions")}')
+
+    def test_posts_without_html_show_escaped_text(self):
+        """Пост и комментарий без готового HTML показываются как
+        экранированный текст
+        """
+        post = Post.objects.create(text='<b>Текст</b>\nвторая строка',
+                                   author=self.author)
+        post.comments.create(author=self.reader, text='<i>Комментарий</i>')
+        Post.objects.update(text_html='', excerpt_html='')
+        post.comments.update(text_html='')
+
+        for url in (reverse('index'),
+                    reverse('post', args=['author', post.pk])):
+            with self.subTest(url=url):
+                content = self.client.get(url).content.decode()
+                self.assertIn('&lt;b&gt;Текст&lt;/b&gt;<br>вторая строка',
+                              content)
+                self.assertNotIn('<b>Текст</b>', content)
+        content = self.client.get(
+            reverse('post', args=['author', post.pk])).content.decode()
+        self.assertIn('&lt;i&gt;Комментарий&lt;/i&gt;', content)
+
+    @override_settings(POST_EXCERPT_LENGTH=20)
+    def test_links_only_to_existing_users_and_whole_tags(self):
+        """Упоминание несуществующего пользователя и оборванный в начале
+        текста тег остаются без ссылок
+        """
+        post = Post.objects.create(text='@reader и #djangoproject @nobody',
+                                   author=self.author)
+        self.assertIn(f'<a href="{reverse("profile", args=["reader"])}">',
+                      post.text_html)
+        self.assertNotIn(reverse('profile', args=['nobody']), post.text_html)
+        self.assertIn(f'<a href="{reverse("tag", args=["djangoproject"])}">',
+                      post.text_html)
+        self.assertTrue(post.has_more)
+        self.assertTrue(post.excerpt_html.endswith(' #djangopr…'))
+        self.assertNotIn('<a href="/tag/', post.excerpt_html)
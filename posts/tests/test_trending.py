@@ -0,0 +1,67 @@
+import math
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from jobs.queue import run_pending
+from posts.models import Post, TrendingPost
+from posts.trending import comment_weight, record_comment, trending_posts
+
+User = get_user_model()
+
+
+class TrendingTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author')
+        cls.posts = [
+            Post.objects.create(text=f'Пост {i}', author=cls.author)
+            for i in range(3)
+        ]
+
+    def test_recent_comments_outweigh_old_ones(self):
+        """Свежие комментарии весят больше старых"""
+        now = timezone.now()
+        old, fresh, _ = TrendingTest.posts
+        for hours in (48, 47, 46):
+            record_comment(old.id, now - timedelta(hours=hours))
+        record_comment(fresh.id, now)
+        self.assertEqual(trending_posts(), [fresh, old])
+
+    def test_scores_add_up_in_database(self):
+        """Повторный комментарий складывает веса в UPDATE без потерь"""
+        now = timezone.now()
+        post = TrendingTest.posts[0]
+        record_comment(post.id, now)
+        record_comment(post.id, now)
+        self.assertAlmostEqual(
+            TrendingPost.objects.get(post=post).score,
+            comment_weight(now) + math.log(2))
+
+    @override_settings(TRENDING_SIZE=2)
+    def test_ranking_is_bounded(self):
+        """В рейтинге хранится не больше TRENDING_SIZE постов"""
+        now = timezone.now()
+        for hours, post in enumerate(TrendingTest.posts):
+            record_comment(post.id, now - timedelta(hours=hours))
+        self.assertEqual(TrendingPost.objects.count(), 2)
+        self.assertEqual(trending_posts(), TrendingTest.posts[:2])
+
+    def test_add_comment_updates_trending_page(self):
+        """Новый комментарий поднимает пост на странице обсуждаемого
+        после выполнения фоновой задачи
+        """
+        client = Client()
+        client.force_login(TrendingTest.author)
+        post = TrendingTest.posts[1]
+        client.post(reverse('add_comment',
+                            args=[TrendingTest.author.username, post.id]),
+                    data={'text': 'Комментарий'})
+        self.assertEqual(trending_posts(), [])
+        run_pending()
+        response = client.get(reverse('trending'))
+        self.assertEqual(response.context.get('posts'), [post])
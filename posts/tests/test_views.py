@@ -1,16 +1,25 @@
 import shutil
 import tempfile
+import threading
 from datetime import datetime as dt
+from unittest import mock
 
 from django import forms
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase, override_settings
+from django.db import connection
+from django.http import HttpResponse
+from django.test import (Client, RequestFactory, TestCase,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from posts.models import Follow, Group, Post
+from posts.models import Comment, Follow, Group, Post
+from posts.ratelimit import consume_token
+from posts.shell_cache import cache_shell, hole_marker
 
 User = get_user_model()
 
@@ -243,6 +252,50 @@ class ViewsTest(TestCase):
         response2 = self.authorized_client.get(reverse('index'))
         self.assertEqual(len(response2.context.get('page').object_list), 2)
 
+    @override_settings(POST_EXCERPT_LENGTH=20)
+    def test_feeds_show_excerpt(self):
+        """Ленты показывают начало длинного поста со ссылкой на полный
+        текст и не читают колонку text
+        """
+        cache.clear()
+        post = Post.objects.create(text='Длинный текст. ' * 10 + 'Финал',
+                                   author=ViewsTest.author)
+        self.assertTrue(post.has_more)
+        post_url = reverse('post', args=[ViewsTest.author.username, post.id])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.guest_client.get(self.reverse_index)
+        self.assertContains(response, post.excerpt)
+        self.assertContains(response, 'Читать дальше')
+        self.assertNotContains(response, 'Финал')
+        self.assertFalse(any('"posts_post"."text"' in query['sql']
+                             for query in queries))
+        response = self.guest_client.get(post_url)
+        self.assertContains(response, 'Финал')
+        self.assertNotContains(response, 'Читать дальше')
+        cache.clear()
+
+    def test_index_shell_holes_per_user(self):
+        """Закэшированная главная подставляет фрагменты текущего
+        пользователя
+        """
+        cache.clear()
+        edit_url = reverse('post_edit',
+                           args=[ViewsTest.author.username, ViewsTest.post.id])
+        response = self.author_authorized_client.get(self.reverse_index)
+        self.assertIn('page', response.context)
+        self.assertContains(response, edit_url)
+
+        response = self.authorized_client.get(self.reverse_index)
+        self.assertNotIn('page', response.context)
+        self.assertContains(response, self.user.username)
+        self.assertNotContains(response, edit_url)
+
+        response = self.guest_client.get(self.reverse_index)
+        self.assertNotIn('page', response.context)
+        self.assertContains(response, 'Войти')
+        self.assertNotContains(response, ViewsTest.author.username + '</a>')
+        cache.clear()
+
     def test_authorized_user_follows_other_users(self):
         """Авторизованный пользователь может подписываться на других"""
         user = User.objects.create(username='user')
@@ -279,6 +332,16 @@ class ViewsTest(TestCase):
         self.assertFalse(Follow.objects.filter(user=user,
                                                author=author).exists())
 
+    def test_follow_unknown_user_returns_404(self):
+        """Подписка на несуществующего пользователя и отписка от него
+        возвращают 404
+        """
+        for name in ('profile_follow', 'profile_unfollow'):
+            with self.subTest(name=name):
+                response = self.authorized_client.get(
+                    reverse(name, args=['nobody']))
+                self.assertEqual(response.status_code, 404)
+
     def test_new_post_in_news_feed(self):
         """Новая запись пользователя появляется в ленте тех,
         кто на него подписан и не появляется в ленте тех,
@@ -302,3 +365,249 @@ class ViewsTest(TestCase):
 
         self.assertIn(post, response1.context.get('page').object_list)
         self.assertNotIn(post, response2.context.get('page').object_list)
+
+    def test_post_view_queries_do_not_depend_on_comments(self):
+        """Число запросов страницы поста не растёт с числом комментариев"""
+        url = reverse('post',
+                      args=[ViewsTest.author.username, ViewsTest.post.id])
+        Comment.objects.create(post=ViewsTest.post, author=self.user,
+                               text='Первый комментарий')
+        self.authorized_client.get(url)
+        with CaptureQueriesContext(connection) as one_comment:
+            self.authorized_client.get(url)
+
+        for i in range(5):
+            commenter = User.objects.create(username=f'commenter{i}')
+            Comment.objects.create(post=ViewsTest.post, author=commenter,
+                                   text=f'Комментарий {i}')
+        with CaptureQueriesContext(connection) as many_comments:
+            response = self.authorized_client.get(url)
+        self.assertContains(response, '@commenter4')
+        self.assertEqual(len(many_comments), len(one_comment))
+
+    @override_settings(STREAMING_RENDER=True)
+    def test_post_view_streaming_render(self):
+        """При STREAMING_RENDER страница поста отдаётся потоком: начало
+        head, страница до комментариев, каждый комментарий отдельным
+        куском и остаток страницы. Комментарии читаются из базы только
+        после отправки начала страницы
+        """
+        for i in range(2):
+            Comment.objects.create(text=f'Комментарий для потока {i}',
+                                   post=ViewsTest.post, author=self.user)
+        response = self.authorized_client.get(
+            reverse('post',
+                    args=[ViewsTest.author.username, ViewsTest.post.id]))
+        self.assertTrue(response.streaming)
+        stream = iter(response.streaming_content)
+        with CaptureQueriesContext(connection) as queries:
+            head = next(stream).decode()
+            top = next(stream).decode()
+        self.assertFalse([query for query in queries.captured_queries
+                          if 'posts_comment"."text' in query['sql']])
+        with CaptureQueriesContext(connection) as queries:
+            chunks = [chunk.decode() for chunk in stream]
+        self.assertTrue([query for query in queries.captured_queries
+                         if 'posts_comment"."text' in query['sql']])
+        self.assertEqual(len(chunks), 3)
+        self.assertIn('bootstrap.min.css', head)
+        self.assertNotIn(ViewsTest.post.text, head)
+        self.assertIn(ViewsTest.post.text, top)
+        self.assertNotIn('Комментарий для потока', top)
+        for i in range(2):
+            self.assertIn(f'Комментарий для потока {i}', chunks[i])
+        self.assertIn('</html>', chunks[2])
+        content = ''.join([head, top, *chunks])
+        self.assertEqual(content.count('<head>'), 1)
+
+    @override_settings(STREAMING_RENDER=True)
+    def test_feed_streaming_render(self):
+        """Ленты отдаются потоком по одному посту и сжимаются на лету,
+        пустой архив показывает свой текст
+        """
+        response = self.authorized_client.get(
+            reverse('profile', args=[ViewsTest.author.username]))
+        chunks = [chunk.decode() for chunk in response.streaming_content]
+        posts = [chunk for chunk in chunks if 'Перейти к посту' in chunk]
+        self.assertEqual(len(posts), ViewsTest.author.posts.count())
+        response = self.authorized_client.get(
+            reverse('group', args=[ViewsTest.group.slug]),
+            HTTP_ACCEPT_ENCODING='gzip')
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        response = self.authorized_client.get(
+            reverse('archive', args=[1999]))
+        self.assertIn('За этот период записей нет.',
+                      b''.join(response.streaming_content).decode())
+
+    def test_only_feeds_are_compressed(self):
+        """Ленты сжимаются gzip, страница поста с CSRF-токеном — нет"""
+        feed = self.authorized_client.get(
+            reverse('profile', args=[ViewsTest.author.username]),
+            HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(feed.get('Content-Encoding'), 'gzip')
+        post = self.authorized_client.get(
+            reverse('post',
+                    args=[ViewsTest.author.username, ViewsTest.post.id]),
+            HTTP_ACCEPT_ENCODING='gzip')
+        self.assertNotIn('Content-Encoding', post)
+
+    @override_settings(RATELIMITS={'add_comment': '2/h'})
+    def test_add_comment_rate_limited(self):
+        """Комментарии сверх лимита отклоняются с кодом 429"""
+        cache.clear()
+        url = reverse('add_comment',
+                      args=[ViewsTest.author.username, ViewsTest.post.id])
+        statuses = [
+            self.authorized_client.post(url, {'text': f'Комментарий {i}'})
+            .status_code
+            for i in range(3)
+        ]
+        self.assertEqual(statuses, [302, 302, 429])
+        self.assertEqual(ViewsTest.post.comments.count(), 2)
+        cache.clear()
+
+    @override_settings(RATELIMITS={'new_post': '2/m'})
+    def test_rate_limit_window_slides(self):
+        """Окно скользит: через полпериода после конца окна, в котором
+        лимит исчерпан, доступен ровно один запрос
+        """
+        cache.clear()
+        url = reverse('new_post')
+        with mock.patch('posts.ratelimit.time.time') as now:
+            now.return_value = 960.0
+            statuses = [self.authorized_client.post(url).status_code
+                        for _ in range(3)]
+            self.assertEqual(statuses, [200, 200, 429])
+            now.return_value = 1050.0
+            responses = [self.authorized_client.post(url) for _ in range(2)]
+            self.assertEqual([response.status_code for response in responses],
+                             [200, 429])
+            self.assertEqual(responses[1]['Retry-After'], '30')
+        cache.clear()
+
+    @override_settings(RATELIMITS={'new_post': '5/m'})
+    def test_rate_limit_holds_under_concurrency(self):
+        """Одновременные запросы не проходят сверх лимита"""
+        cache.clear()
+        request = RequestFactory().post('/')
+        request.session = {}
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(
+                    consume_token(request, 'new_post')))
+            for _ in range(20)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results.count(0), 5)
+        cache.clear()
+
+    @override_settings(RATELIMITS={'new_post': '1/h'},
+                       RATELIMIT_PROXY_COUNT=1)
+    def test_rate_limit_uses_forwarded_client_ip(self):
+        """За обратным прокси лимит считается по адресу клиента
+        из X-Forwarded-For, а не по адресу прокси
+        """
+        cache.clear()
+        url = reverse('new_post')
+        statuses = [
+            Client().post(url, HTTP_X_FORWARDED_FOR=address).status_code
+            for address in ('1.1.1.1', '2.2.2.2', 'spoofed, 1.1.1.1')
+        ]
+        self.assertEqual(statuses, [302, 302, 429])
+        cache.clear()
+
+    def test_follow_is_idempotent(self):
+        """Повторная подписка и подписка на себя не создают записей"""
+        self.assertEqual(Follow.objects.follow(
+            self.user, [ViewsTest.author.username, self.user.username]), 1)
+        self.assertEqual(Follow.objects.follow(
+            self.user, [ViewsTest.author.username]), 0)
+        self.assertEqual(Follow.objects.filter(user=self.user).count(), 1)
+
+    def test_follow_batch(self):
+        """Пакетная подписка и отписка от нескольких авторов"""
+        authors = [User.objects.create(username=f'batch{i}')
+                   for i in range(3)]
+        usernames = [author.username for author in authors] + ['nobody']
+        response = self.authorized_client.post(
+            reverse('follow_batch'),
+            {'action': 'follow', 'username': usernames})
+        self.assertRedirects(response, reverse('follow_index'))
+        self.assertEqual(Follow.objects.filter(user=self.user).count(), 3)
+
+        self.authorized_client.post(
+            reverse('follow_batch'),
+            {'action': 'unfollow', 'username': usernames[:2]})
+        self.assertEqual(
+            list(Follow.objects.filter(user=self.user)
+                 .values_list('author__username', flat=True)),
+            ['batch2'])
+
+        response = self.authorized_client.post(
+            reverse('follow_batch'), {'action': 'drop', 'username': 'x'})
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(RATELIMITS={'profile_follow': '3/m'})
+    def test_follow_batch_rate_limited_per_author(self):
+        """Каждый автор в пакете расходует лимит подписок"""
+        cache.clear()
+        url = reverse('follow_batch')
+        statuses = [
+            self.authorized_client.post(
+                url, {'action': 'follow', 'username': usernames}).status_code
+            for usernames in (['a', 'b'], ['c', 'd'], ['e'])
+        ]
+        self.assertEqual(statuses, [302, 429, 302])
+        response = self.authorized_client.post(
+            url, {'action': 'follow', 'username': 'f'})
+        self.assertEqual(response.status_code, 429)
+        cache.clear()
+
+
+class ShellCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.factory = RequestFactory()
+
+    def get(self, view, path='/shell/'):
+        request = self.factory.get(path)
+        request.user = AnonymousUser()
+        return view(request)
+
+    def test_response_headers_and_cookies_are_kept(self):
+        """Ответ view сохраняет заголовки и куки при промахе,
+        а заголовки — и при попадании в кэш
+        """
+        @cache_shell(20)
+        def view(request):
+            response = HttpResponse(hole_marker('nav_user', {}),
+                                    content_type='text/plain')
+            response['X-Shell'] = 'yes'
+            response.set_cookie('visited', '1')
+            return response
+
+        miss = self.get(view)
+        self.assertIn('visited', miss.cookies)
+        hit = self.get(view)
+        for response in (miss, hit):
+            with self.subTest(cached=response is hit):
+                self.assertEqual(response['X-Shell'], 'yes')
+                self.assertEqual(response['Content-Type'], 'text/plain')
+                self.assertNotIn(b'<!--hole:', response.content)
+
+    def test_error_pages_are_filled_and_not_cached(self):
+        """Ответ с ошибкой не кэшируется, но метки в нём заполняются"""
+        @cache_shell(20)
+        def view(request):
+            return HttpResponse(hole_marker('nav_user', {}), status=404)
+
+        response = self.get(view)
+        self.assertEqual(response.status_code, 404)
+        self.assertContains(response, 'Войти', status_code=404)
+        self.assertEqual(self.get(view).status_code, 404)
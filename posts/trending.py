@@ -0,0 +1,62 @@
+import math
+from datetime import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Exp, Greatest, Least, Ln
+from django.utils import timezone
+
+from .models import TrendingPost
+
+# Оценка хранится как логарифм суммы весов комментариев, приведённых
+# к общей точке отсчёта: вес комментария растёт со временем вдвое каждые
+# TRENDING_HALF_LIFE_HOURS. Поэтому сравнение оценок разных постов
+# совпадает с сравнением их «затухших» на текущий момент значений,
+# и старые строки не нужно пересчитывать.
+EPOCH = datetime(2021, 1, 1, tzinfo=timezone.utc)
+
+
+def comment_weight(moment):
+    hours = (moment - EPOCH).total_seconds() / 3600
+    return hours * math.log(2) / settings.TRENDING_HALF_LIFE_HOURS
+
+
+def _logaddexp(score, weight):
+    """log(exp(score) + exp(weight)) как выражение для UPDATE."""
+    weight = Value(weight, output_field=FloatField())
+    big, small = Greatest(score, weight), Least(score, weight)
+    return big + Ln(Value(1.0) + Exp(small - big))
+
+
+def record_comment(post_id, moment=None):
+    weight = comment_weight(moment or timezone.now())
+    with transaction.atomic():
+        _, created = TrendingPost.objects.get_or_create(
+            post_id=post_id, defaults={'score': weight})
+        if not created:
+            # Оценка пересчитывается одним UPDATE, поэтому одновременные
+            # комментарии не затирают вклад друг друга.
+            TrendingPost.objects.filter(post_id=post_id).update(
+                score=_logaddexp(F('score'), weight),
+                updated=timezone.now())
+        # Храним только TRENDING_SIZE лучших постов.
+        threshold = (TrendingPost.objects.order_by('-score')
+                     .values_list('score', flat=True)
+                     [settings.TRENDING_SIZE - 1:settings.TRENDING_SIZE])
+        if threshold:
+            TrendingPost.objects.filter(score__lt=threshold[0]).delete()
+
+
+def trending_posts(limit=None):
+    limit = limit or settings.TRENDING_SIZE
+    return [
+        trending.post
+        for trending in TrendingPost.objects.filter(
+            # Как posts.purge.hide_purged, но через связь с постом.
+            post__author__purge__isnull=True,
+            post__group__purge__isnull=True,
+        ).select_related(
+            'post__author', 'post__group'
+        ).defer('post__text', 'post__text_html')[:limit]
+    ]
@@ -4,15 +4,47 @@ from . import views
 
 urlpatterns = [
     path('group/<slug:slug>/', views.group_posts, name='group'),
+    path(
+        'group/<slug:slug>/archive/<int:year>/',
+        views.post_archive,
+        name='group_archive'
+    ),
+    path(
+        'group/<slug:slug>/archive/<int:year>/<int:month>/',
+        views.post_archive,
+        name='group_archive_month'
+    ),
+    path('archive/<int:year>/', views.post_archive, name='archive'),
+    path(
+        'archive/<int:year>/<int:month>/',
+        views.post_archive,
+        name='archive_month'
+    ),
+    path('groups/', views.group_index, name='groups'),
     path('', views.index, name='index'),
     path('new/', views.new_post, name='new_post'),
     path('follow/', views.follow_index, name='follow_index'),
+    path('follow/batch/', views.follow_batch, name='follow_batch'),
+    path('trending/', views.trending, name='trending'),
+    path('tag/<str:name>/', views.tag_posts, name='tag'),
+    path('mentions/', views.mentions, name='mentions'),
+    path('notifications/', views.notifications, name='notifications'),
     path(
         '<str:username>/follow/',
         views.profile_follow,
         name='profile_follow'
     ),
     path('<str:username>/', views.profile, name='profile'),
+    path(
+        '<str:username>/archive/<int:year>/',
+        views.post_archive,
+        name='profile_archive'
+    ),
+    path(
+        '<str:username>/archive/<int:year>/<int:month>/',
+        views.post_archive,
+        name='profile_archive_month'
+    ),
     path(
         '<str:username>/unfollow/',
         views.profile_unfollow,
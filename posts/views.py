@@ -2,20 +2,45 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.db.models import Prefetch
+from django.http import HttpResponseBadRequest
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_POST
 
+from .date_archive import archive_months, month_bounds, scope_for
+from .feeds import chained_feed, index_feed, linked_feed
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post
+from .models import (ArchivedComment, ArchivedPost, Comment, Follow, Group,
+                     Post, Tag)
+from .notifications import mark_read
+from .purge import hide_purged
+from .ratelimit import ratelimit
+from .shell_cache import cache_shell
+from .streaming import stream_render
+from .tasks import (make_thumbnail, notify_comment, notify_follow,
+                    refresh_recommendations, update_trending)
+from .trending import trending_posts
 
 User = get_user_model()
 posts_per_page = settings.POSTS_PER_PAGE
 
 
-@cache_page(20)
+def _post_items(page, template_name='includes/post_item.html'):
+    # Посты страницы ленты для stream_render.
+    return ('post', template_name, page)
+
+
+# Сжимаются только ленты: в них нет CSRF-токена и других секретов,
+# которые можно подобрать атакой BREACH по размеру сжатого ответа.
+# Страницы с формами, включая страницу поста, отдаются без сжатия.
+@gzip_page
+@cache_shell(20)
 def index(request):
-    post_list = Post.objects.all()
-    paginator = Paginator(post_list, posts_per_page)
+    paginator = Paginator(
+        index_feed(),
+        posts_per_page
+    )
     page_number = request.GET.get('page')
     page = paginator.get_page(page_number)
     return render(request, 'index.html', {
@@ -24,19 +49,72 @@ def index(request):
     })
 
 
+@gzip_page
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    group_posts_list = group.posts.all()
-    paginator = Paginator(group_posts_list, posts_per_page)
+    group = get_object_or_404(Group, slug=slug, purge__isnull=True)
+    paginator = Paginator(
+        chained_feed(group.posts.all(), group.archived_posts.all(),
+                     f'group:{group.pk}'),
+        posts_per_page
+    )
     page_number = request.GET.get('page')
     page = paginator.get_page(page_number)
-    return render(request, 'group.html', {
+    return stream_render(request, 'group.html', {
         'group': group,
         'page': page,
         'paginator': paginator,
+    }, items=_post_items(page))
+
+
+@gzip_page
+def group_index(request):
+    groups = Group.objects.filter(purge__isnull=True).select_related(
+        'stats', 'stats__last_post__author').order_by('title')
+    paginator = Paginator(groups, settings.GROUPS_PER_PAGE)
+    page_number = request.GET.get('page')
+    page = paginator.get_page(page_number)
+    return render(request, 'groups.html', {
+        'page': page,
+        'paginator': paginator,
     })
 
 
+@gzip_page
+def post_archive(request, year, month=None, slug=None, username=None):
+    group = author = None
+    posts_list = Post.objects.all()
+    archived_list = ArchivedPost.objects.all()
+    if slug is not None:
+        group = get_object_or_404(Group, slug=slug, purge__isnull=True)
+        posts_list = group.posts.all()
+        archived_list = group.archived_posts.all()
+    elif username is not None:
+        author = get_object_or_404(User, username=username,
+                                   purge__isnull=True)
+        posts_list = author.posts.all()
+        archived_list = author.archived_posts.all()
+    start, end = month_bounds(year, month)
+    period = {'pub_date__gte': start, 'pub_date__lt': end}
+    paginator = Paginator(
+        chained_feed(posts_list.filter(**period),
+                     archived_list.filter(**period),
+                     f'archive:{scope_for(group, author)}:{year}:{month}'),
+        posts_per_page
+    )
+    page_number = request.GET.get('page')
+    page = paginator.get_page(page_number)
+    return stream_render(request, 'archive.html', {
+        'group': group,
+        'author': author,
+        'year': year,
+        'month': start if month is not None else None,
+        'months': archive_months(group, author),
+        'page': page,
+        'paginator': paginator,
+    }, items=_post_items(page))
+
+
+@ratelimit('new_post', methods=('POST',))
 @login_required
 def new_post(request):
     form = PostForm(request.POST or None)
@@ -44,47 +122,79 @@ def new_post(request):
         newpost = form.save(commit=False)
         newpost.author = request.user
         form.save()
+        if newpost.image:
+            make_thumbnail.enqueue(post_id=newpost.id)
         return redirect('index')
     return render(request, 'new_post.html', {'form': form})
 
 
+@gzip_page
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts_of_user = author.posts.all()
-    paginator = Paginator(posts_of_user, posts_per_page)
+    author = get_object_or_404(User, username=username, purge__isnull=True)
+    paginator = Paginator(
+        chained_feed(author.posts.all(), author.archived_posts.all(),
+                     f'profile:{author.pk}'),
+        posts_per_page
+    )
     page_number = request.GET.get('page')
     page = paginator.get_page(page_number)
     if request.user.is_authenticated:
         following = Follow.objects.filter(user=request.user,
                                           author=author)
-        return render(request, 'profile.html', {
+        return stream_render(request, 'profile.html', {
             'author': author,
             'page': page,
             'paginator': paginator,
             'following': following,
-        })
-    return render(request, 'profile.html', {
+        }, items=_post_items(page, 'includes/profile_post.html'))
+    return stream_render(request, 'profile.html', {
         'author': author,
         'page': page,
         'paginator': paginator,
-    })
+    }, items=_post_items(page, 'includes/profile_post.html'))
+
+
+def _visible_comments(comments):
+    return comments.filter(author__purge__isnull=True).select_related('author')
+
+
+def _with_comments(post_model, comment_model):
+    posts = post_model.objects.select_related('author', 'group')
+    if settings.STREAMING_RENDER:
+        # Комментарии читаются уже во время потоковой отдачи страницы.
+        return posts
+    return posts.prefetch_related(
+        Prefetch('comments',
+                 queryset=_visible_comments(comment_model.objects.all()))
+    )
 
 
 def post_view(request, username, post_id):
-    post = get_object_or_404(Post, author__username=username, id=post_id)
-    comments = post.comments.all()
+    lookup = {'author__username': username, 'id': post_id}
+    post = hide_purged(_with_comments(Post, Comment)).filter(
+        **lookup).first()
+    if post is None:
+        # Старые посты перенесены в архив командой archive_posts.
+        post = get_object_or_404(
+            hide_purged(_with_comments(ArchivedPost, ArchivedComment)),
+            **lookup)
+    if settings.STREAMING_RENDER:
+        comments = _visible_comments(post.comments.all())
+    else:
+        comments = post.comments.all()
     form = CommentForm(request.POST or None)
-    return render(request, 'post.html', {
+    return stream_render(request, 'post.html', {
         'post': post,
         'author': post.author,
         'comments': comments,
         'form': form,
-    })
+    }, items=('item', 'includes/comment_item.html', comments.iterator()))
 
 
 @login_required
 def post_edit(request, username, post_id):
-    post = get_object_or_404(Post, author__username=username, id=post_id)
+    post = get_object_or_404(hide_purged(Post.objects.all()),
+                             author__username=username, id=post_id)
     if post.author != request.user:
         return redirect('post', username=username, post_id=post_id)
     form = PostForm(request.POST or None, files=request.FILES or None,
@@ -92,6 +202,8 @@ def post_edit(request, username, post_id):
     if form.is_valid():
         form.save(commit=False)
         form.save()
+        if post.image:
+            make_thumbnail.enqueue(post_id=post.id)
         return redirect('post', username=username, post_id=post_id)
     return render(request, 'new_post.html', {
         'form': form,
@@ -100,53 +212,153 @@ def post_edit(request, username, post_id):
     })
 
 
+@ratelimit('add_comment', methods=('POST',))
 @login_required
 def add_comment(request, username, post_id):
-    post = get_object_or_404(Post, author__username=username, id=post_id)
+    post = get_object_or_404(hide_purged(Post.objects.all()),
+                             author__username=username, id=post_id)
     form = CommentForm(request.POST or None)
     if form.is_valid():
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
         form.save()
+        update_trending.enqueue(post_id=post.id,
+                                created=comment.created.isoformat())
+        notify_comment.enqueue(post_id=post.id, actor_id=request.user.id)
         return redirect('post', username=username, post_id=post_id)
     return render(request,
                   'includes/add_comment.html',
                   {'form': form, 'post': post, })
 
 
+@gzip_page
+def trending(request):
+    return render(request, 'trending.html', {'posts': trending_posts()})
+
+
+@gzip_page
+def tag_posts(request, name):
+    tag = get_object_or_404(Tag, name=name.lower())
+    paginator = Paginator(
+        linked_feed(Post.objects.filter(post_tags__tag=tag),
+                    '-post_tags__pub_date', f'tag:{tag.pk}'),
+        posts_per_page
+    )
+    page_number = request.GET.get('page')
+    page = paginator.get_page(page_number)
+    return stream_render(request, 'tag.html', {
+        'tag': tag,
+        'page': page,
+        'paginator': paginator,
+    }, items=_post_items(page))
+
+
+@gzip_page
+@login_required
+def mentions(request):
+    paginator = Paginator(
+        linked_feed(Post.objects.filter(mentions__user=request.user),
+                    '-mentions__pub_date', f'mentions:{request.user.pk}'),
+        posts_per_page
+    )
+    page_number = request.GET.get('page')
+    page = paginator.get_page(page_number)
+    return stream_render(request, 'mentions.html', {
+        'page': page,
+        'paginator': paginator,
+    }, items=_post_items(page))
+
+
+@gzip_page
 @login_required
 def follow_index(request):
-    posts_list = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(posts_list, posts_per_page)
+    paginator = Paginator(
+        chained_feed(
+            Post.objects.filter(author__following__user=request.user),
+            ArchivedPost.objects.filter(author__following__user=request.user),
+            f'follow:{request.user.pk}'
+        ),
+        posts_per_page
+    )
     page_number = request.GET.get('page')
     page = paginator.get_page(page_number)
-    return render(
+    return stream_render(
         request,
         'follow.html',
         {'page': page,
-         'paginator': paginator, })
+         'paginator': paginator, },
+        items=_post_items(page))
 
 
+@login_required
+def notifications(request):
+    paginator = Paginator(
+        request.user.notifications.filter(
+            actor__purge__isnull=True).select_related('actor'),
+        settings.NOTIFICATIONS_PER_PAGE
+    )
+    page_number = request.GET.get('page')
+    page = paginator.get_page(page_number)
+    # Шаблон ещё видит, какие уведомления были новыми.
+    mark_read(request.user, page)
+    return render(request, 'notifications.html', {
+        'page': page,
+        'paginator': paginator,
+    })
+
+
+@ratelimit('profile_follow')
 @login_required
 def profile_follow(request, username):
-    author = get_object_or_404(User, username=username)
-    user = request.user
-    if author != user:
-        Follow.objects.get_or_create(user=user, author=author)
-        return redirect('profile', username=username)
+    get_object_or_404(User, username=username, purge__isnull=True)
+    if Follow.objects.follow(request.user, [username]):
+        refresh_recommendations.enqueue(user_id=request.user.id)
+        notify_follow.enqueue(actor_id=request.user.id, username=username)
     return redirect('profile', username=username)
 
 
 @login_required
 def profile_unfollow(request, username):
-    author = get_object_or_404(User, username=username)
-    user = request.user
-    follow = Follow.objects.filter(user=user, author=author)
-    follow.delete()
+    get_object_or_404(User, username=username)
+    if Follow.objects.unfollow(request.user, [username]):
+        refresh_recommendations.enqueue(user_id=request.user.id)
     return redirect('profile', username=username)
 
 
+def _follow_batch_size(request):
+    return len(request.POST.getlist('username'))
+
+
+# Каждый автор в пакете расходует лимит так же, как отдельная подписка.
+@ratelimit('profile_follow', cost=_follow_batch_size)
+@login_required
+@require_POST
+def follow_batch(request):
+    usernames = request.POST.getlist('username')
+    action = request.POST.get('action')
+    if (action not in ('follow', 'unfollow')
+            or len(usernames) > settings.FOLLOW_BATCH_LIMIT):
+        return HttpResponseBadRequest()
+    if action == 'follow':
+        followed = set(Follow.objects.filter(
+            user=request.user, author__username__in=usernames
+        ).values_list('author__username', flat=True))
+        changed = Follow.objects.follow(request.user, usernames)
+        if changed:
+            # Несуществующих авторов и самого пользователя задача
+            # пропустит.
+            notify_follow.enqueue(actor_id=request.user.id, usernames=[
+                username for username in dict.fromkeys(usernames)
+                if username not in followed
+            ])
+    else:
+        changed = Follow.objects.unfollow(request.user, usernames)
+    if changed:
+        refresh_recommendations.enqueue(user_id=request.user.id)
+    return redirect('follow_index')
+
+
 def page_not_found(request, exception):
     return render(
         request,
@@ -0,0 +1,67 @@
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth import (BACKEND_SESSION_KEY, HASH_SESSION_KEY,
+                                 SESSION_KEY)
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.auth.models import AnonymousUser
+from django.utils.crypto import constant_time_compare
+from django.utils.functional import SimpleLazyObject
+
+from yatube.caches import shared_cache
+
+
+def user_cache_key(user_id):
+    return f'auth_user:{user_id}'
+
+
+def get_cached_user(request):
+    if not hasattr(request, '_cached_user'):
+        request._cached_user = _resolve_user(request)
+    return request._cached_user
+
+
+def _resolve_user(request):
+    user_id = request.session.get(SESSION_KEY)
+    backend_path = request.session.get(BACKEND_SESSION_KEY)
+    cache = shared_cache()
+    # В кэше отдельного процесса изменения пользователя, сделанные
+    # в других процессах, не видны, поэтому без общего кэша пользователь
+    # загружается из базы.
+    if (cache is None or user_id is None
+            or backend_path not in settings.AUTHENTICATION_BACKENDS):
+        return auth.get_user(request)
+    key = user_cache_key(user_id)
+    user = cache.get(key)
+    if user is None:
+        user = auth.get_user(request)
+        if user.is_authenticated:
+            cache.set(key, user, settings.AUTH_USER_CACHE_TIMEOUT)
+        return user
+    # Та же проверка хэша пароля, что и в django.contrib.auth.get_user:
+    # после смены пароля старые сессии становятся недействительными.
+    session_hash = request.session.get(HASH_SESSION_KEY)
+    if not (session_hash and constant_time_compare(
+            session_hash, user.get_session_auth_hash())):
+        request.session.flush()
+        return AnonymousUser()
+    # Как ModelBackend.get_user: отключённый пользователь не авторизуется,
+    # даже если его копия в кэше ещё не сброшена.
+    backend = auth.load_backend(backend_path)
+    can_authenticate = getattr(backend, 'user_can_authenticate', None)
+    if can_authenticate is not None and not can_authenticate(user):
+        cache.delete(key)
+        return AnonymousUser()
+    user.backend = backend_path
+    return user
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    """AuthenticationMiddleware, которая берёт пользователя из общего
+    кэша (SHARED_CACHE_LOCATION), а не из auth_user. Кэш сбрасывается
+    при сохранении и удалении пользователя, в том числе при смене пароля.
+    Без общего кэша работает как обычная AuthenticationMiddleware.
+    """
+
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: get_cached_user(request))
@@ -0,0 +1,148 @@
+from datetime import timedelta
+from http.cookies import SimpleCookie
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from users.middleware import user_cache_key
+
+User = get_user_model()
+
+
+class PurgeSessionsCommandTest(TestCase):
+    def test_purge_sessions_removes_only_expired(self):
+        """purge_sessions удаляет только истёкшие сессии"""
+        now = timezone.now()
+        for i in range(5):
+            Session.objects.create(session_key=f'expired{i}',
+                                   session_data='',
+                                   expire_date=now - timedelta(days=1))
+        Session.objects.create(session_key='alive', session_data='',
+                               expire_date=now + timedelta(days=1))
+        out = StringIO()
+        call_command('purge_sessions', chunk_size=2, pause=0, stdout=out)
+        self.assertEqual(
+            list(Session.objects.values_list('session_key', flat=True)),
+            ['alive'])
+        self.assertIn('5', out.getvalue())
+
+
+SHARED_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'shared',
+    },
+}
+
+
+@override_settings(CACHES=SHARED_CACHES,
+                   SESSION_ENGINE='django.contrib.sessions.backends.cached_db',
+                   SESSION_CACHE_ALIAS='shared')
+class CachedSessionTest(TestCase):
+    def setUp(self):
+        caches['shared'].clear()
+        self.user = User.objects.create_user(username='session',
+                                             password='password1')
+        self.client = Client()
+        self.client.login(username='session', password='password1')
+
+    def session_queries(self, client):
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(reverse('about:author'))
+        return response, [query['sql'] for query in queries
+                          if 'django_session' in query['sql']]
+
+    def test_session_is_read_from_shared_cache(self):
+        """Сессия читается из общего кэша без запроса к django_session"""
+        response, queries = self.session_queries(self.client)
+        self.assertTrue(response.context['user'].is_authenticated)
+        self.assertEqual(queries, [])
+
+    def test_logout_removes_cached_session(self):
+        """После выхода сессия удаляется из общего кэша, и её кука
+        больше не авторизует
+        """
+        cache_key = ('django.contrib.sessions.cached_db'
+                     f'{self.client.session.session_key}')
+        self.assertIsNotNone(caches['shared'].get(cache_key))
+        old_client = Client()
+        old_client.cookies = SimpleCookie(self.client.cookies)
+        self.client.get(reverse('logout'))
+        self.assertIsNone(caches['shared'].get(cache_key))
+        response, _ = self.session_queries(old_client)
+        self.assertFalse(response.context['user'].is_authenticated)
+
+
+@override_settings(CACHES=SHARED_CACHES)
+class CachedAuthenticationMiddlewareTest(TestCase):
+    def setUp(self):
+        caches['shared'].clear()
+        self.user = User.objects.create_user(username='cached',
+                                             password='password1')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def auth_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('about:author'))
+        return response, [query['sql'] for query in queries
+                          if 'auth_user' in query['sql']]
+
+    def test_returning_user_is_served_from_cache(self):
+        """Повторный запрос не обращается к таблице auth_user"""
+        response, queries = self.auth_queries()
+        self.assertEqual(response.context['user'], self.user)
+        self.assertEqual(len(queries), 1)
+        response, queries = self.auth_queries()
+        self.assertEqual(response.context['user'], self.user)
+        self.assertEqual(queries, [])
+
+    def test_password_change_invalidates_cached_user(self):
+        """После смены пароля сессия из кэша перестаёт действовать"""
+        self.auth_queries()
+        self.user.set_password('password2')
+        self.user.save()
+        response, _ = self.auth_queries()
+        self.assertFalse(response.context['user'].is_authenticated)
+
+    def test_deactivated_user_is_logged_out(self):
+        """Отключённый пользователь перестаёт быть авторизованным:
+        сохранение сбрасывает его копию в общем кэше
+        """
+        self.auth_queries()
+        self.user.is_active = False
+        self.user.save(update_fields=['is_active'])
+        response, _ = self.auth_queries()
+        self.assertFalse(response.context['user'].is_authenticated)
+
+    def test_inactive_cached_user_is_rejected(self):
+        """Копия отключённого пользователя из кэша не авторизует"""
+        self.auth_queries()
+        key = user_cache_key(self.user.pk)
+        cached = caches['shared'].get(key)
+        cached.is_active = False
+        caches['shared'].set(key, cached)
+        response, _ = self.auth_queries()
+        self.assertFalse(response.context['user'].is_authenticated)
+        self.assertIsNone(caches['shared'].get(key))
+
+    @override_settings(CACHES={'default': SHARED_CACHES['default']})
+    def test_user_is_not_cached_without_shared_cache(self):
+        """Без общего кэша пользователь загружается из базы на каждом
+        запросе
+        """
+        self.auth_queries()
+        response, queries = self.auth_queries()
+        self.assertEqual(response.context['user'], self.user)
+        self.assertEqual(len(queries), 1)
@@ -0,0 +1,11 @@
+from django.conf import settings
+from django.core.cache import caches
+
+
+def shared_cache():
+    """Кэш, общий для всех процессов (SHARED_CACHE_LOCATION), или None,
+    если он не настроен и у каждого процесса только свой LocMem.
+    """
+    if 'shared' not in settings.CACHES:
+        return None
+    return caches['shared']
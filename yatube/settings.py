@@ -39,6 +39,8 @@ INSTALLED_APPS = [
     'about',
     'users',
     'posts',
+    'jobs',
+    'monitoring',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -49,11 +51,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'monitoring.middleware.ProfilerMiddleware',
+    'monitoring.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'users.middleware.CachedAuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -65,6 +69,9 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
+        # With DEBUG off Django wraps the default loaders in cached.Loader,
+        # so every template is compiled once per process; yatube/wsgi.py
+        # precompiles them all at worker start
         'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
@@ -79,6 +86,11 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
+# Load URL resolvers, templates, sorl-thumbnail, Pillow plugins and the
+# translation catalog when yatube/wsgi.py is imported, before the worker
+# accepts requests (yatube.warmup)
+WSGI_WARMUP = not DEBUG
+
 
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
@@ -142,10 +154,117 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 # Paginator parameter
 POSTS_PER_PAGE = 10
-
-# Cache
+GROUPS_PER_PAGE = 50
+
+# Feeds show the first POST_EXCERPT_LENGTH characters of a post (stored in
+# Post.excerpt) and link to the post page for the rest
+POST_EXCERPT_LENGTH = 300
+
+# Feeds with at least this many posts serve a cached total instead of
+# running COUNT(*); the total is recounted in the background once it is
+# older than PAGINATOR_COUNT_TTL seconds
+PAGINATOR_COUNT_THRESHOLD = 1000
+PAGINATOR_COUNT_TTL = 60
+
+# Posts older than this many days are moved to the archive tables by
+# `manage.py archive_posts`; feeds and permalinks read both transparently
+POSTS_ARCHIVE_AFTER_DAYS = 180
+
+# Deleted users and groups are hidden at once and their rows are removed
+# by a background job, PURGE_BATCH_SIZE rows at a time with PURGE_PAUSE
+# seconds between batches
+PURGE_BATCH_SIZE = 500
+PURGE_PAUSE = 1
+
+# The unread notifications badge is served from the cache and recounted at
+# least every NOTIFICATIONS_COUNT_TTL seconds; with SHARED_CACHE_LOCATION
+# the counter is also incremented when run_workers writes notifications
+NOTIFICATIONS_COUNT_TTL = 30
+NOTIFICATIONS_PER_PAGE = 20
+
+# "Who to follow": how many suggestions build_recommendations stores per
+# user and how far back author activity is counted
+RECOMMENDATIONS_LIMIT = 5
+RECOMMENDATIONS_ACTIVITY_DAYS = 30
+
+# Trending posts: comment weight halves every TRENDING_HALF_LIFE_HOURS and
+# only the TRENDING_SIZE hottest posts are kept
+TRENDING_HALF_LIFE_HOURS = 6
+TRENDING_SIZE = 100
+
+# Background jobs (`manage.py run_workers`): failed jobs are retried after
+# JOBS_RETRY_DELAY seconds, doubling on every attempt; jobs running longer
+# than JOBS_TIMEOUT seconds are handed to another worker. JOBS_EAGER runs
+# jobs inline instead of queueing them
+JOBS_EAGER = False
+JOBS_RETRY_DELAY = 10
+JOBS_TIMEOUT = 300
+
+# Write rate limits per user and per IP, "<requests>/<s|m|h|d>", counted
+# over a sliding window of one period; requests over the limit get a 429
+# response. Counters live in the shared cache, or in each process's own
+# cache without SHARED_CACHE_LOCATION
+RATELIMITS = {
+    'new_post': '10/m',
+    'add_comment': '30/m',
+    'profile_follow': '60/m',
+}
+# Number of reverse proxies in front of the site that append the address
+# they got the request from to X-Forwarded-For; 0 uses REMOTE_ADDR
+RATELIMIT_PROXY_COUNT = 0
+
+# Most authors a single follow/batch/ request may follow or unfollow; every
+# author counts against the profile_follow rate limit, so keep it no larger
+FOLLOW_BATCH_LIMIT = 60
+
+# Stream long pages (post, profile, group, tag, mentions, archive and follow
+# feeds): the start of <head> goes out first, then the page up to its list,
+# then each post card or comment as it is read and rendered, then the rest.
+# Feeds are gzipped on the fly; the post page carries a CSRF token and is
+# not compressed (BREACH)
+STREAMING_RENDER = False
+
+# cProfile a PROFILER_SAMPLE_RATE fraction of requests, plus requests that
+# send "X-Profile: <PROFILER_TOKEN>"; profiles go to PROFILER_DIR/<view>/
+# and are summarised with `manage.py profile_report`
+PROFILER_SAMPLE_RATE = 0
+PROFILER_TOKEN = None
+PROFILER_DIR = os.path.join(BASE_DIR, 'profiles')
+
+# Prometheus metrics at /metrics, readable by staff users or with
+# "Authorization: Bearer <METRICS_TOKEN>". Server and run_workers processes
+# write their values to METRICS_DIR at most every METRICS_FLUSH_INTERVAL
+# seconds and the endpoint adds them up, merging files of exited processes
+METRICS_TOKEN = None
+METRICS_DIR = os.path.join(BASE_DIR, 'metrics')
+METRICS_FLUSH_INTERVAL = 5
+
+# Cache; hits and misses are counted per key prefix for /metrics
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+        'BACKEND': 'monitoring.cache.InstrumentedLocMemCache',
+    },
 }
+
+# Memcached ("host:port") shared by all web and job worker processes.
+# Without it every process only has its own LocMem cache: sessions and
+# logged-in users are read from the database and rate limits are counted
+# per process
+SHARED_CACHE_LOCATION = None
+if SHARED_CACHE_LOCATION:
+    CACHES['shared'] = {
+        'BACKEND': 'monitoring.cache.InstrumentedMemcachedCache',
+        'LOCATION': SHARED_CACHE_LOCATION,
+    }
+
+# With a shared cache sessions are read from it and only fall back to
+# django_session on a miss. A per-process cache would keep a flushed
+# session valid in other workers, so without one sessions stay in the
+# database. Expired rows are removed with `manage.py purge_sessions`
+if SHARED_CACHE_LOCATION:
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+    SESSION_CACHE_ALIAS = 'shared'
+
+# Logged-in users are resolved from the shared cache for this many seconds
+# (users.middleware.CachedAuthenticationMiddleware)
+AUTH_USER_CACHE_TIMEOUT = 300
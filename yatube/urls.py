@@ -25,6 +25,7 @@ handler500 = 'posts.views.server_error'  # noqa
 urlpatterns = [
     path('auth/', include('users.urls')),
     path('auth/', include('django.contrib.auth.urls')),
+    path('', include('monitoring.urls')),
     path('', include('posts.urls')),
     path('admin/', admin.site.urls),
     path('about/', include('about.urls', namespace='about')),
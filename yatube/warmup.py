@@ -0,0 +1,103 @@
+import os
+import time
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.template import TemplateSyntaxError, engines
+from django.template.utils import get_app_template_dirs
+from django.urls import get_resolver
+from django.utils import formats, timezone, translation
+
+
+def warm_up():
+    """Загружает всё, что иначе загрузилось бы на первых запросах воркера.
+
+    Вызывается из yatube/wsgi.py при WSGI_WARMUP. Возвращает словарь
+    {шаг: время в секундах}.
+    """
+    timings = {}
+    for step in (resolve_urls, precompile_templates, load_thumbnail_engine,
+                 load_translations, prime_counts):
+        start = time.perf_counter()
+        step()
+        timings[step.__name__] = time.perf_counter() - start
+    return timings
+
+
+def resolve_urls():
+    resolver = get_resolver()
+    # reverse_dict строит таблицы reverse() для всех вложенных include().
+    return len(resolver.reverse_dict)
+
+
+def load_thumbnail_engine():
+    from PIL import Image
+    from sorl.thumbnail import default
+
+    # Pillow регистрирует форматы лениво, при первом открытии файла.
+    Image.init()
+    # Обращение к любому атрибуту создаёт объект за ленивой обёрткой.
+    default.backend.get_thumbnail
+    default.engine.get_image
+    default.kvstore.get
+    default.storage.exists
+
+
+def load_translations():
+    with translation.override(settings.LANGUAGE_CODE):
+        translation.gettext('Log in')
+        formats.date_format(timezone.now(), 'DATETIME_FORMAT')
+
+
+def prime_counts():
+    from posts.feeds import index_feed
+
+    try:
+        index_feed().count()
+    except DatabaseError:
+        # База может быть ещё не готова, например до migrate.
+        pass
+
+
+def precompile_templates():
+    """Загружает все шаблоны проекта, чтобы cached.Loader скомпилировал
+    их до первого запроса. Возвращает число загруженных шаблонов.
+    """
+    compiled = 0
+    for backend in engines.all():
+        engine = getattr(backend, 'engine', None)
+        if engine is None:
+            continue
+        dirs = list(engine.dirs)
+        if engine.app_dirs or _uses_app_directories(engine):
+            dirs.extend(get_app_template_dirs('templates'))
+        for template_name in _iter_template_names(dirs):
+            try:
+                engine.get_template(template_name)
+            except TemplateSyntaxError:
+                # Шаблоны, которые подключаются только через extends из
+                # других приложений, могут не собираться отдельно.
+                continue
+            compiled += 1
+    return compiled
+
+
+def _uses_app_directories(engine):
+    loaders = []
+    for loader in engine.loaders:
+        if isinstance(loader, (list, tuple)):
+            loaders.append(loader[0])
+            loaders.extend(loader[1] if len(loader) > 1 else [])
+        else:
+            loaders.append(loader)
+    return 'django.template.loaders.app_directories.Loader' in loaders
+
+
+def _iter_template_names(dirs):
+    for template_dir in dirs:
+        for root, _, files in os.walk(template_dir):
+            for file_name in files:
+                if file_name.endswith(('.html', '.txt')):
+                    path = os.path.join(root, file_name)
+                    yield os.path.relpath(path, template_dir).replace(
+                        os.sep, '/')
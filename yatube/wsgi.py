@@ -9,8 +9,23 @@ https://docs.djangoproject.com/en/2.2/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
+from monitoring import metrics
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+metrics.enable()
+
+if settings.WSGI_WARMUP:
+    from django.db import connections
+
+    from yatube.warmup import warm_up
+
+    warm_up()
+    # Соединения, открытые при прогреве, не должны достаться процессам,
+    # которые сервер создаст через fork.
+    connections.close_all()